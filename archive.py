@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import os
+import gzip
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SEGMENT_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.idx'
+
+
+# Append-only gzip JSONL segments, one gzip member per page, with an .idx sidecar for random access
+class ResponseArchive:
+    def __init__(self, archive_dir: str = 'archive', max_segment_bytes: int = 64 * 1024 * 1024):
+        self.archive_dir = archive_dir
+        self.max_segment_bytes = max_segment_bytes
+        self._segment = None
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def _segment_path(self) -> str:
+        # One segment series per UTC day and process, rotated by size
+        day = datetime.now(timezone.utc).strftime('%Y%m%d')
+        if self._segment and os.path.basename(self._segment).startswith(day):
+            if os.path.getsize(self._segment) < self.max_segment_bytes:
+                return self._segment
+
+        n = 0
+        while True:
+            name = f"{day}-{os.getpid()}-{n:03d}{SEGMENT_SUFFIX}"
+            path = os.path.join(self.archive_dir, name)
+            if not os.path.exists(path) or os.path.getsize(path) < self.max_segment_bytes:
+                self._segment = path
+                return path
+            n += 1
+
+    def append(self, subreddit: str, endpoint: str, params: dict, data: Dict) -> Tuple[str, int]:
+        fetched_at = time.time()
+        record = {
+            'fetched_at': fetched_at,
+            'subreddit': subreddit,
+            'endpoint': endpoint,
+            'params': params,
+            'data': data
+        }
+        blob = gzip.compress((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+        children = len(data.get('data', {}).get('children', []))
+
+        path = self._segment_path()
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(blob)
+        with open(path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX, 'a', encoding='utf-8') as f:
+            f.write(f"{offset}\t{len(blob)}\t{subreddit}\t{endpoint}\t{fetched_at:.3f}\t{children}\n")
+        return path, offset
+
+    def segments(self) -> List[str]:
+        return sorted(
+            os.path.join(self.archive_dir, name)
+            for name in os.listdir(self.archive_dir)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    @staticmethod
+    def read_index(segment_path: str) -> List[Dict]:
+        index_path = segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        entries = []
+        if not os.path.exists(index_path):
+            return entries
+        with open(index_path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 6:
+                    continue
+                entries.append({
+                    'offset': int(parts[0]),
+                    'length': int(parts[1]),
+                    'subreddit': parts[2],
+                    'endpoint': parts[3],
+                    'fetched_at': float(parts[4]),
+                    'children': int(parts[5])
+                })
+        return entries
+
+    @staticmethod
+    def read_record(segment_path: str, offset: int, length: int) -> Dict:
+        with open(segment_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+
+    @staticmethod
+    def iter_segment(segment_path: str) -> Iterator[Dict]:
+        with gzip.open(segment_path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            except (EOFError, OSError) as e:
+                # A crash mid-write leaves a truncated trailing member
+                print(f"    ⚠️ Truncated segment {os.path.basename(segment_path)}: {e}")
+
+
+def reprocess_segment(segment_path: str, subreddits: Optional[List[str]] = None) -> List[Tuple]:
+    # Imported here so worker processes don't pull in the scraper at module load
+    from reddit_scraper_noauth import RedditURLScraperNoAuth
+
+    wanted = {s.lower() for s in subreddits} if subreddits else None
+    rows = set()
+    seen_posts = set()
+
+    for record in ResponseArchive.iter_segment(segment_path):
+        subreddit = record.get('subreddit', '')
+        if wanted and subreddit.lower() not in wanted:
+            continue
+        for post_data in record.get('data', {}).get('data', {}).get('children', []):
+            post = post_data.get('data', {})
+            post_id = post.get('id')
+            if not post_id or (subreddit, post_id) in seen_posts:
+                continue
+            seen_posts.add((subreddit, post_id))
+
+            post_date = datetime.fromtimestamp(post.get('created_utc', 0), timezone.utc).replace(tzinfo=None)
+            for url in RedditURLScraperNoAuth.extract_post_urls(post):
+                rows.add((url, subreddit, post_id, post_date))
+
+    return list(rows)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List
+from flask import Flask, jsonify, request
+from database import Database
+
+LEASE_TTL = 120
+# Bounds for a client-requested ttl: too short expires at once, too long pins an item
+MIN_LEASE_TTL = 30
+MAX_LEASE_TTL = 600
+MAX_ATTEMPTS = 5
+
+# All writes to the database go through this process, one at a time
+write_lock = threading.Lock()
+
+
+# Work items (subreddit + endpoint) handed out to workers through expiring leases
+class LeaseQueue:
+    def __init__(self, db: Database):
+        self.db = db
+        self.conn = db.conn
+
+    def create_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mode TEXT NOT NULL,
+                subreddit TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                params TEXT NOT NULL,
+                cutoff_ts REAL,
+                max_pages INTEGER NOT NULL DEFAULT 10,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                posts INTEGER NOT NULL DEFAULT 0,
+                urls INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_work_state ON work_items(state, lease_expires)
+        """)
+        self.conn.commit()
+
+    def enqueue(self, mode: str, subreddit: str, endpoint: str, params: dict,
+                cutoff_ts: Optional[float], max_pages: int = 10) -> bool:
+        params_json = json.dumps(params, sort_keys=True)
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id FROM work_items
+            WHERE subreddit = ? AND endpoint = ? AND params = ? AND state IN ('pending', 'leased')
+        """, (subreddit, endpoint, params_json))
+        if cursor.fetchone():
+            return False
+        cursor.execute("""
+            INSERT INTO work_items (mode, subreddit, endpoint, params, cutoff_ts, max_pages)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (mode, subreddit, endpoint, params_json, cutoff_ts, max_pages))
+        self.conn.commit()
+        return True
+
+    def enqueue_backfill(self, subreddits: List[str], days: int, endpoints: List) -> int:
+        cutoff_ts = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+        added = 0
+        for subreddit in subreddits:
+            for endpoint, params in endpoints:
+                added += self.enqueue('backfill', subreddit, endpoint, params, cutoff_ts)
+        return added
+
+    def enqueue_daily(self, subreddits: List[str]) -> int:
+        added = 0
+        for subreddit in subreddits:
+            cutoff_ts = self.db.get_last_scrape_timestamp(subreddit)
+            if not cutoff_ts:
+                cutoff_ts = (datetime.now(timezone.utc) - timedelta(days=1)).timestamp()
+            added += self.enqueue('daily', subreddit, 'new', {}, cutoff_ts)
+        return added
+
+    def requeue_expired(self) -> int:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE work_items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                worker = NULL, lease_expires = NULL
+            WHERE state = 'leased' AND lease_expires < ?
+        """, (MAX_ATTEMPTS, time.time()))
+        self.conn.commit()
+        return cursor.rowcount
+
+    def lease(self, worker: str, ttl: float = LEASE_TTL) -> Optional[Dict[str, Any]]:
+        self.requeue_expired()
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("""
+                SELECT * FROM work_items WHERE state = 'pending' ORDER BY id LIMIT 1
+            """)
+            row = cursor.fetchone()
+            if not row:
+                self.conn.commit()
+                return None
+            cursor.execute("""
+                UPDATE work_items SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = ?
+            """, (worker, time.time() + ttl, row['id']))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        item = dict(row)
+        item['params'] = json.loads(item['params'])
+        item['attempts'] += 1
+        item['lease_ttl'] = ttl
+        return item
+
+    def heartbeat(self, item_id: int, worker: str, ttl: float = LEASE_TTL) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE work_items SET lease_expires = ? WHERE id = ? AND worker = ? AND state = 'leased'
+        """, (time.time() + ttl, item_id, worker))
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def add_results(self, item_id: int, worker: str, rows: List) -> Optional[int]:
+        # rows are [url, post_id, created_utc]; inserts are idempotent so a
+        # re-queued item can safely send the same rows again. None if worker doesn't hold the lease
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT subreddit FROM work_items WHERE id = ? AND worker = ? AND state = 'leased'
+        """, (item_id, worker))
+        item = cursor.fetchone()
+        if not item:
+            return None
+        subreddit = item['subreddit']
+        new_urls = self.db.add_urls([
+            (url, subreddit, post_id, datetime.fromtimestamp(created_utc, timezone.utc).replace(tzinfo=None))
+            for url, post_id, created_utc in rows
+        ])
+        cursor.execute("UPDATE work_items SET urls = urls + ? WHERE id = ?", (new_urls, item_id))
+        self.conn.commit()
+        return new_urls
+
+    def complete(self, item_id: int, worker: str, posts: int) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE work_items SET state = 'done', lease_expires = NULL, posts = ?
+            WHERE id = ? AND worker = ? AND state = 'leased'
+        """, (posts, item_id, worker))
+        self.conn.commit()
+        if cursor.rowcount == 0:
+            return False
+        cursor.execute("SELECT mode, subreddit FROM work_items WHERE id = ?", (item_id,))
+        item = cursor.fetchone()
+        if item['mode'] == 'daily':
+            self.db.update_last_scrape(item['subreddit'])
+        return True
+
+    def fail(self, item_id: int, worker: str, error: str = None) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE work_items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                worker = NULL, lease_expires = NULL
+            WHERE id = ? AND worker = ? AND state = 'leased'
+        """, (MAX_ATTEMPTS, item_id, worker))
+        self.conn.commit()
+        if error:
+            print(f"  ⚠️ Item {item_id} failed on {worker}: {error}")
+        return cursor.rowcount > 0
+
+    def status(self) -> Dict[str, Any]:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT state, COUNT(*) as items, SUM(posts) as posts, SUM(urls) as urls
+            FROM work_items GROUP BY state
+        """)
+        counts = {row['state']: {'items': row['items'], 'posts': row['posts'], 'urls': row['urls']}
+                  for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT worker, COUNT(*) as items FROM work_items WHERE state = 'leased' GROUP BY worker
+        """)
+        return {
+            'states': counts,
+            'workers': {row['worker']: row['items'] for row in cursor.fetchall()}
+        }
+
+
+# ============================================
+# HTTP API (workers talk to this)
+# ============================================
+app = Flask(__name__)
+COORDINATOR_TOKEN = os.environ.get('COORDINATOR_TOKEN', '')
+DB_PATH = 'reddit_urls.db'
+
+
+@app.before_request
+def check_token():
+    if COORDINATOR_TOKEN and request.headers.get('X-Coordinator-Token') != COORDINATOR_TOKEN:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+FIELD_CHECKS = {
+    'item': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'worker': lambda value: isinstance(value, str) and value != '',
+    # [url, post_id, created_utc]
+    'rows': lambda value: isinstance(value, list) and all(
+        isinstance(row, list) and len(row) == 3 and isinstance(row[0], str)
+        and isinstance(row[1], str) and is_number(row[2]) for row in value
+    ),
+    'ttl': is_number,
+    'posts': lambda value: isinstance(value, int) and not isinstance(value, bool),
+}
+
+
+def read_request(*required):
+    # Returns (data, None), or (None, error response) for a missing or malformed field
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None, (jsonify({'error': 'JSON body required'}), 400)
+    for field, check in FIELD_CHECKS.items():
+        if field in required or field in data:
+            if not check(data.get(field)):
+                return None, (jsonify({'error': f'{field} missing or invalid'}), 400)
+    return data, None
+
+
+def lease_ttl(data):
+    return min(max(data.get('ttl', LEASE_TTL), MIN_LEASE_TTL), MAX_LEASE_TTL)
+
+
+def with_queue(fn):
+    with write_lock:
+        db = Database(DB_PATH)
+        try:
+            return fn(LeaseQueue(db))
+        finally:
+            db.close()
+
+
+@app.route('/lease', methods=['POST'])
+def lease():
+    data, error = read_request('worker')
+    if error:
+        return error
+    worker = data['worker']
+
+    def run(queue):
+        item = queue.lease(worker, ttl=lease_ttl(data))
+        states = queue.status()['states']
+        return {'item': item, 'leased': states.get('leased', {}).get('items', 0)}
+    return jsonify(with_queue(run))
+
+
+@app.route('/heartbeat', methods=['POST'])
+def heartbeat():
+    data, error = read_request('item', 'worker')
+    if error:
+        return error
+    ok = with_queue(lambda queue: queue.heartbeat(data['item'], data['worker'], lease_ttl(data)))
+    return jsonify({'ok': ok})
+
+
+@app.route('/results', methods=['POST'])
+def results():
+    data, error = read_request('item', 'worker', 'rows')
+    if error:
+        return error
+    new_urls = with_queue(lambda queue: queue.add_results(data['item'], data['worker'], data['rows']))
+    if new_urls is None:
+        return jsonify({'error': 'Item is not leased to this worker'}), 409
+    return jsonify({'new_urls': new_urls})
+
+
+@app.route('/complete', methods=['POST'])
+def complete():
+    data, error = read_request('item', 'worker')
+    if error:
+        return error
+    ok = with_queue(lambda queue: queue.complete(data['item'], data['worker'], data.get('posts', 0)))
+    return jsonify({'ok': ok})
+
+
+@app.route('/fail', methods=['POST'])
+def fail():
+    data, error = read_request('item', 'worker')
+    if error:
+        return error
+    ok = with_queue(lambda queue: queue.fail(data['item'], data['worker'], data.get('error')))
+    return jsonify({'ok': ok})
+
+
+@app.route('/status')
+def status():
+    return jsonify(with_queue(lambda queue: queue.status()))
+
+
+def main():
+    global DB_PATH
+
+    parser = argparse.ArgumentParser(description='Reddit URL Scraper - work coordinator for distributed workers')
+    parser.add_argument('--backfill', type=int, metavar='DAYS',
+                       help='Queue backfill work for the last N days (all endpoints)')
+    parser.add_argument('--daily', action='store_true',
+                       help='Queue daily work (new posts since last run)')
+    parser.add_argument('--subreddits', nargs='+', metavar='SUB',
+                       help='List of subreddits to queue')
+    parser.add_argument('--db', default=DB_PATH, metavar='FILE',
+                       help='Database file (default: reddit_urls.db)')
+    parser.add_argument('--host', default='127.0.0.1',
+                       help='Address to listen on (default: 127.0.0.1; others need COORDINATOR_TOKEN)')
+    parser.add_argument('--port', type=int, default=3020)
+    args = parser.parse_args()
+
+    if (args.backfill or args.daily) and not args.subreddits:
+        print("❌ Error: --subreddits required")
+        return
+
+    # /results writes straight into the database, so never serve it unauthenticated on the network
+    if not COORDINATOR_TOKEN and args.host not in ('127.0.0.1', 'localhost', '::1'):
+        print("❌ Error: set COORDINATOR_TOKEN to listen on a non-loopback address")
+        return
+
+    DB_PATH = args.db
+    db = Database(DB_PATH)
+    queue = LeaseQueue(db)
+    # Once here rather than on every request
+    queue.create_tables()
+
+    if args.backfill:
+        # Imported here so the coordinator doesn't need requests unless queueing
+        from reddit_scraper_noauth import RedditURLScraperNoAuth
+        added = queue.enqueue_backfill(args.subreddits, args.backfill, RedditURLScraperNoAuth.ENDPOINTS)
+        print(f"📥 Queued {added} backfill items")
+    if args.daily:
+        added = queue.enqueue_daily(args.subreddits)
+        print(f"📥 Queued {added} daily items")
+    db.close()
+
+    print(f"🛰️  Coordinator listening on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
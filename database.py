@@ -1,13 +1,45 @@
 #!/usr/bin/env python3
-import sqlite3
+import os
+import re
 import csv
-from datetime import datetime
-from typing import Optional, Dict, Any
+import heapq
+import sqlite3
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+from urllib.request import pathname2url
+
+# Monthly partition files: urls_YYYY_MM.db (writable) and urls_YYYY_MM.archive.db (read-only)
+PARTITION_NAME = re.compile(r'^urls_(\d{4})_(\d{2})(\.archive)?\.db$')
+PARTITION_COLUMNS = 'id, url, subreddit, post_id, post_date, scraped_at, canonical_url'
+
+
+def _normalize_date(value: Optional[str]) -> Optional[str]:
+    # '2025-01-31' -> '2025-01-31 00:00:00', the format post_date is stored in
+    if not value:
+        return None
+    return value if len(value) > 10 else value + ' 00:00:00'
+
+
+def _month_bounds(month: str) -> Tuple[str, str]:
+    year, mon = int(month[:4]), int(month[5:7])
+    next_year, next_mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return f"{year:04d}-{mon:02d}-01 00:00:00", f"{next_year:04d}-{next_mon:02d}-01 00:00:00"
+
+
+def _shift_month(month: str, delta: int) -> str:
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
 
 class Database:
-    def __init__(self, db_path='reddit_urls.db'):
+    def __init__(self, db_path='reddit_urls.db', timeout: float = 5.0, partition_dir: str = None):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.timeout = timeout
+        self.partition_dir = partition_dir or os.path.splitext(db_path)[0] + '_partitions'
+        self._partition_conns = {}
+        self.conn = sqlite3.connect(db_path, timeout=timeout)
         self.conn.row_factory = sqlite3.Row
         self._create_tables()
     
@@ -24,6 +56,10 @@ class Database:
                 UNIQUE(url, subreddit, post_id)
             )
         """)
+        # Added after the first release; older databases get the column here
+        columns = {row['name'] for row in cursor.execute("PRAGMA table_info(urls)")}
+        if 'canonical_url' not in columns:
+            cursor.execute("ALTER TABLE urls ADD COLUMN canonical_url TEXT")
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_subreddit ON urls(subreddit)
         """)
@@ -36,19 +72,118 @@ class Database:
                 last_scrape_timestamp REAL
             )
         """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS data_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS posts (
+                post_id TEXT PRIMARY KEY,
+                subreddit TEXT NOT NULL,
+                created_utc REAL NOT NULL,
+                edited REAL,
+                content_hash TEXT NOT NULL,
+                processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_posts_subreddit ON posts(subreddit, created_utc)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS poll_schedule (
+                subreddit TEXT PRIMARY KEY,
+                post_rate REAL NOT NULL,
+                next_poll REAL NOT NULL,
+                last_poll REAL
+            )
+        """)
         self.conn.commit()
     
     def add_url(self, url: str, subreddit: str, post_date: datetime, post_id: str) -> bool:
+        if not self._drop_partitioned([(url, subreddit, post_id, post_date)]):
+            return False
         cursor = self.conn.cursor()
         try:
             cursor.execute("""
                 INSERT INTO urls (url, subreddit, post_id, post_date) VALUES (?, ?, ?, ?)
             """, (url, subreddit, post_id, post_date))
-            self.conn.commit()
+            self.bump_data_version()
             return True
         except sqlite3.IntegrityError:
             return False
     
+    def add_urls(self, rows: List[Tuple], chunk_size: int = 5000) -> int:
+        # rows are (url, subreddit, post_id, post_date); returns number inserted
+        rows = self._drop_partitioned(rows)
+        cursor = self.conn.cursor()
+        inserted = 0
+        for i in range(0, len(rows), chunk_size):
+            cursor.executemany("""
+                INSERT OR IGNORE INTO urls (url, subreddit, post_id, post_date) VALUES (?, ?, ?, ?)
+            """, rows[i:i + chunk_size])
+            inserted += cursor.rowcount
+        if inserted:
+            self.bump_data_version()
+        else:
+            self.conn.commit()
+        return inserted
+    
+    def _drop_partitioned(self, rows: List[Tuple]) -> List[Tuple]:
+        # UNIQUE only holds within one file: rows for a month that was already rolled
+        # out are new only if that month's partition doesn't have them
+        partitions = {month: (path, archived) for month, path, archived in self._partitions()}
+        if not partitions:
+            return rows
+        
+        kept = []
+        for row in rows:
+            partition = partitions.get(str(row[3])[:7])
+            if partition:
+                conn = self._partition_conn(*partition)
+                cursor = conn.execute("""
+                    SELECT 1 FROM urls WHERE url = ? AND subreddit = ? AND post_id = ?
+                """, row[:3])
+                if cursor.fetchone():
+                    continue
+            kept.append(row)
+        return kept
+    
+    def load_post_index(self, subreddit: str, since_ts: float = None) -> Dict[str, str]:
+        # post_id -> content_hash for posts already processed in this subreddit
+        cursor = self.conn.cursor()
+        if since_ts:
+            cursor.execute("""
+                SELECT post_id, content_hash FROM posts WHERE subreddit = ? AND created_utc >= ?
+            """, (subreddit, since_ts))
+        else:
+            cursor.execute("""
+                SELECT post_id, content_hash FROM posts WHERE subreddit = ?
+            """, (subreddit,))
+        return {row['post_id']: row['content_hash'] for row in cursor.fetchall()}
+    
+    def mark_posts_processed(self, rows: List[Tuple]):
+        # rows are (post_id, subreddit, created_utc, edited, content_hash)
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO posts (post_id, subreddit, created_utc, edited, content_hash) VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        self.conn.commit()
+    
+    def bump_data_version(self):
+        # Read by the dashboard cache; called once per write, commits the pending transaction
+        self.conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+        self.conn.commit()
+    
+    def get_data_version(self) -> int:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT version FROM data_version WHERE id = 1")
+        return cursor.fetchone()['version']
+    
     def get_last_scrape_timestamp(self, subreddit: str) -> Optional[float]:
         cursor = self.conn.cursor()
         cursor.execute("""
@@ -65,22 +200,247 @@ class Database:
         """, (subreddit, timestamp))
         self.conn.commit()
     
-    def export_to_csv(self, output_file: str) -> int:
+    def get_poll_state(self, subreddit: str) -> Optional[Dict[str, Any]]:
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT url, post_date, subreddit, post_id FROM urls ORDER BY post_date DESC
-        """)
-        rows = cursor.fetchall()
+            SELECT post_rate, next_poll, last_poll FROM poll_schedule WHERE subreddit = ?
+        """, (subreddit,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def save_poll_state(self, subreddit: str, post_rate: float, next_poll: float, last_poll: Optional[float]):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO poll_schedule (subreddit, post_rate, next_poll, last_poll) VALUES (?, ?, ?, ?)
+        """, (subreddit, post_rate, next_poll, last_poll))
+        self.conn.commit()
+    
+    def count_recent_posts(self, subreddit: str, since: datetime) -> int:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) as posts FROM posts WHERE subreddit = ? AND created_utc >= ?
+        """, (subreddit, since.replace(tzinfo=timezone.utc).timestamp()))
+        count = cursor.fetchone()['posts']
+        if count:
+            return count
+        # Older databases only know about posts that had URLs
+        cursor.execute("""
+            SELECT COUNT(DISTINCT post_id) as posts FROM urls WHERE subreddit = ? AND post_date >= ?
+        """, (subreddit, since))
+        return cursor.fetchone()['posts']
+    
+    def iter_urls(self) -> Iterator[sqlite3.Row]:
+        # All rows, newest first, streamed across the hot table and every partition
+        cursors = []
+        for conn in self._sources():
+            cursor = conn.cursor()
+            cursor.execute("SELECT url, post_date, subreddit, post_id FROM urls ORDER BY post_date DESC")
+            cursors.append(cursor)
+        return heapq.merge(*cursors, key=lambda row: row['post_date'], reverse=True)
+    
+    def export_to_csv(self, output_file: str) -> int:
+        count = 0
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(['url', 'post_date', 'subreddit', 'post_id'])
-            for row in rows:
+            for row in self.iter_urls():
                 writer.writerow([row['url'], row['post_date'], row['subreddit'], row['post_id']])
-        return len(rows)
+                count += 1
+        return count
+    
+    # ============================================
+    # PARTITIONS
+    # ============================================
+    def _partitions(self, date_from: str = None, date_to: str = None,
+                    writable: bool = False) -> List[Tuple[str, str, bool]]:
+        # (month, path, archived) for partition files overlapping [date_from, date_to), newest first
+        if not os.path.isdir(self.partition_dir):
+            return []
+        
+        months = {}
+        for name in os.listdir(self.partition_dir):
+            match = PARTITION_NAME.match(name)
+            if not match:
+                continue
+            month = f"{match.group(1)}-{match.group(2)}"
+            archived = bool(match.group(3))
+            # After an interrupted compaction both files exist; the archive is complete
+            if month in months and months[month][1]:
+                continue
+            months[month] = (os.path.join(self.partition_dir, name), archived)
+        
+        lo, hi = _normalize_date(date_from), _normalize_date(date_to)
+        partitions = []
+        for month in sorted(months, reverse=True):
+            start, end = _month_bounds(month)
+            path, archived = months[month]
+            if (hi and start >= hi) or (lo and end <= lo) or (writable and archived):
+                continue
+            partitions.append((month, path, archived))
+        return partitions
+    
+    def _partition_path(self, month: str, archived: bool = False) -> str:
+        suffix = '.archive.db' if archived else '.db'
+        return os.path.join(self.partition_dir, f"urls_{month[:4]}_{month[5:7]}{suffix}")
+    
+    def _partition_conn(self, path: str, archived: bool) -> sqlite3.Connection:
+        conn = self._partition_conns.get(path)
+        if conn is None:
+            if archived:
+                # Archives never change, so SQLite can skip locking and map the file
+                uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro&immutable=1"
+                conn = sqlite3.connect(uri, uri=True)
+                conn.execute("PRAGMA mmap_size = 268435456")
+            else:
+                conn = sqlite3.connect(path, timeout=self.timeout)
+            conn.row_factory = sqlite3.Row
+            self._partition_conns[path] = conn
+        return conn
+    
+    def _close_partition(self, path: str):
+        conn = self._partition_conns.pop(path, None)
+        if conn:
+            conn.close()
+    
+    def _sources(self, date_from: str = None, date_to: str = None,
+                 writable: bool = False) -> List[sqlite3.Connection]:
+        # The hot table first, then the partitions a date range can touch
+        return [self.conn] + [
+            self._partition_conn(path, archived)
+            for _, path, archived in self._partitions(date_from, date_to, writable)
+        ]
+    
+    @staticmethod
+    def _create_partition(path: str):
+        conn = sqlite3.connect(path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                subreddit TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                post_date TIMESTAMP NOT NULL,
+                scraped_at TIMESTAMP,
+                canonical_url TEXT,
+                UNIQUE(url, subreddit, post_id)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_subreddit ON urls(subreddit)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_post_date ON urls(post_date DESC)")
+        conn.commit()
+        conn.close()
     
-    def get_stats(self, subreddit: str = None, search: str = None) -> Dict[str, Any]:
+    def roll_partitions(self, hot_months: int) -> Dict[str, int]:
+        # Moves rows older than the last hot_months months into monthly partition files
+        if hot_months < 1:
+            raise ValueError('hot_months must be at least 1')
+        cutoff, _ = _month_bounds(_shift_month(datetime.utcnow().strftime('%Y-%m'), -(hot_months - 1)))
+        
         cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT substr(post_date, 1, 7) as month FROM urls WHERE post_date < ?
+        """, (cutoff,))
+        months = [row['month'] for row in cursor.fetchall()]
+        if months:
+            os.makedirs(self.partition_dir, exist_ok=True)
         
+        moved = {}
+        for month in months:
+            path = self._partition_path(month)
+            archive_path = self._partition_path(month, archived=True)
+            if os.path.exists(archive_path):
+                # Late rows for an archived month
+                self.unarchive_partition(month)
+            self._create_partition(path)
+            
+            start, end = _month_bounds(month)
+            # ATTACH makes the copy and the delete one atomic transaction across both files
+            self.conn.execute("ATTACH DATABASE ? AS part", (path,))
+            try:
+                self.conn.execute(f"""
+                    INSERT OR IGNORE INTO part.urls ({PARTITION_COLUMNS})
+                    SELECT {PARTITION_COLUMNS} FROM main.urls WHERE post_date >= ? AND post_date < ?
+                """, (start, end))
+                cursor = self.conn.execute("""
+                    DELETE FROM main.urls WHERE post_date >= ? AND post_date < ?
+                """, (start, end))
+                moved[month] = cursor.rowcount
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                self.conn.execute("DETACH DATABASE part")
+        if moved:
+            self.bump_data_version()
+        return moved
+    
+    def unarchive_partition(self, month: str) -> str:
+        # Turns an archive back into a writable partition; the next compaction archives it again
+        path = self._partition_path(month)
+        archive_path = self._partition_path(month, archived=True)
+        self._close_partition(archive_path)
+        os.chmod(archive_path, 0o644)
+        os.replace(archive_path, path)
+        return path
+    
+    def partition_paths(self, writable: bool = False) -> List[str]:
+        return [path for _, path, _ in self._partitions(writable=writable)]
+    
+    def writable_connections(self) -> List[sqlite3.Connection]:
+        # The hot table and every writable partition
+        return self._sources(writable=True)
+    
+    def archived_partitions(self) -> List[Tuple[str, sqlite3.Connection]]:
+        return [(month, self._partition_conn(path, True))
+                for month, path, archived in self._partitions() if archived]
+    
+    def count_archived(self, ids: List[int] = None, subreddit: str = None, search: str = None,
+                       date_from: str = None, date_to: str = None, contains: str = None,
+                       chunk_size: int = 500) -> int:
+        # Rows matching ids or a filter that sit in read-only archives
+        where_sql, params = self._build_where(subreddit, search, date_from, date_to)
+        if contains:
+            where_sql += (" AND" if where_sql else " WHERE") + " instr(url, ?) > 0"
+            params.append(contains)
+        count = 0
+        for _, path, archived in self._partitions(date_from, date_to):
+            if not archived:
+                continue
+            cursor = self._partition_conn(path, True).cursor()
+            if ids is not None:
+                for i in range(0, len(ids), chunk_size):
+                    chunk = ids[i:i + chunk_size]
+                    cursor.execute(f"SELECT COUNT(*) FROM urls WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                    count += cursor.fetchone()[0]
+            else:
+                cursor.execute(f"SELECT COUNT(*) FROM urls{where_sql}", params)
+                count += cursor.fetchone()[0]
+        return count
+    
+    def compact_partitions(self, archive_after_months: int) -> List[str]:
+        # Rewrites partitions older than archive_after_months into compact read-only archives
+        cutoff = _shift_month(datetime.utcnow().strftime('%Y-%m'), -archive_after_months)
+        compacted = []
+        for month, path, archived in self._partitions():
+            if archived or month >= cutoff:
+                continue
+            archive_path = self._partition_path(month, archived=True)
+            tmp_path = archive_path + '.tmp'
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            
+            self._partition_conn(path, False).execute("VACUUM INTO ?", (tmp_path,))
+            self._close_partition(path)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, archive_path)
+            os.remove(path)
+            compacted.append(month)
+        return compacted
+    
+    @staticmethod
+    def _build_where(subreddit: str = None, search: str = None, date_from: str = None,
+                     date_to: str = None) -> Tuple[str, List]:
         # Build WHERE clause for filters
         where_clauses = []
         params = []
@@ -90,33 +450,142 @@ class Database:
         if search:
             where_clauses.append("(url LIKE ? OR post_id LIKE ?)")
             params.extend([f'%{search}%', f'%{search}%'])
+        if date_from:
+            where_clauses.append("post_date >= ?")
+            params.append(date_from)
+        if date_to:
+            where_clauses.append("post_date < ?")
+            params.append(date_to)
         where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        return where_sql, params
+    
+    def _delete_in(self, conn: sqlite3.Connection, ids: Optional[List[int]], where_sql: str,
+                   params: List, chunk_size: int) -> int:
+        cursor = conn.cursor()
+        deleted = 0
+        try:
+            if ids is not None:
+                for i in range(0, len(ids), chunk_size):
+                    chunk = ids[i:i + chunk_size]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f"DELETE FROM urls WHERE id IN ({placeholders})", chunk)
+                    deleted += cursor.rowcount
+            else:
+                while True:
+                    cursor.execute(f"""
+                        DELETE FROM urls WHERE id IN (SELECT id FROM urls{where_sql} LIMIT ?)
+                    """, params + [chunk_size])
+                    if cursor.rowcount == 0:
+                        break
+                    deleted += cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return deleted
+    
+    def delete_urls(self, ids: List[int] = None, subreddit: str = None, search: str = None,
+                    date_from: str = None, date_to: str = None, chunk_size: int = 500) -> int:
+        # Deletes by id list or by filter, in chunks but inside one transaction per file.
+        # Archived partitions are read-only and are left untouched.
+        where_sql, params = self._build_where(subreddit, search, date_from, date_to)
+        if ids is None and not where_sql:
+            raise ValueError('A filter is required to delete by filter')
+        
+        deleted = 0
+        for conn in self._sources(date_from, date_to, writable=True):
+            deleted += self._delete_in(conn, ids, where_sql, params, chunk_size)
+        if deleted:
+            self.bump_data_version()
+        return deleted
+    
+    def update_urls(self, updates: List[Tuple[str, int]], chunk_size: int = 500) -> int:
+        # updates are (new_url, id); rows that would duplicate an existing URL are left unchanged
+        updated = 0
+        for conn in self._sources(writable=True):
+            cursor = conn.cursor()
+            changed = 0
+            try:
+                for i in range(0, len(updates), chunk_size):
+                    cursor.executemany("""
+                        UPDATE OR IGNORE urls SET url = ?, canonical_url = NULL WHERE id = ?
+                    """, updates[i:i + chunk_size])
+                    changed += cursor.rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            updated += changed
+        if updated:
+            self.bump_data_version()
+        return updated
+    
+    def replace_in_urls(self, find: str, replace: str, subreddit: str = None, search: str = None,
+                        date_from: str = None, date_to: str = None) -> int:
+        # Find/replace inside url for every row matching the filter, one transaction per file;
+        # rows that would duplicate an existing URL are left unchanged
+        where_sql, params = self._build_where(subreddit, search, date_from, date_to)
+        where_sql += (" AND" if where_sql else " WHERE") + " instr(url, ?) > 0"
+        updated = 0
+        for conn in self._sources(date_from, date_to, writable=True):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"""
+                    UPDATE OR IGNORE urls SET url = replace(url, ?, ?), canonical_url = NULL{where_sql}
+                """, [find, replace] + params + [find])
+                updated += cursor.rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        if updated:
+            self.bump_data_version()
+        return updated
+    
+    def update_url(self, url_id: int, new_url: str) -> int:
+        for conn in self._sources(writable=True):
+            cursor = conn.cursor()
+            # The resolved target belonged to the old URL
+            cursor.execute("UPDATE urls SET url = ?, canonical_url = NULL WHERE id = ?", (new_url, url_id))
+            conn.commit()
+            if cursor.rowcount:
+                self.bump_data_version()
+                return cursor.rowcount
+        return 0
+    
+    def delete_url(self, url_id: int) -> int:
+        return self.delete_urls(ids=[url_id])
+    
+    def get_stats(self, subreddit: str = None, search: str = None, date_from: str = None,
+                  date_to: str = None) -> Dict[str, Any]:
+        where_sql, params = self._build_where(subreddit, search, date_from, date_to)
+        
+        total = 0
+        subreddits = set()
+        oldest = newest = None
+        for conn in self._sources(date_from, date_to):
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) as total, MIN(post_date) as oldest, MAX(post_date) as newest FROM urls{where_sql}", params)
+            row = cursor.fetchone()
+            if not row['total']:
+                continue
+            total += row['total']
+            oldest = row['oldest'] if oldest is None else min(oldest, row['oldest'])
+            newest = row['newest'] if newest is None else max(newest, row['newest'])
+            cursor.execute(f"SELECT DISTINCT subreddit FROM urls{where_sql}", params)
+            subreddits.update(r['subreddit'] for r in cursor.fetchall())
         
-        cursor.execute(f"SELECT COUNT(*) as total FROM urls{where_sql}", params)
-        total = cursor.fetchone()['total']
-        cursor.execute(f"SELECT COUNT(DISTINCT subreddit) as subs FROM urls{where_sql}", params)
-        subs = cursor.fetchone()['subs']
-        cursor.execute(f"SELECT MIN(post_date) as oldest, MAX(post_date) as newest FROM urls{where_sql}", params)
-        row = cursor.fetchone()
         return {
             'total_urls': total,
-            'subreddits': subs,
-            'oldest_post': row['oldest'],
-            'newest_post': row['newest']
+            'subreddits': len(subreddits),
+            'oldest_post': oldest,
+            'newest_post': newest
         }
     
-    def get_urls(self, page: int = 1, per_page: int = 50, subreddit: str = None, search: str = None, sort: str = 'post_date', order: str = 'desc'):
-        cursor = self.conn.cursor()
+    def get_urls(self, page: int = 1, per_page: int = 50, subreddit: str = None, search: str = None, sort: str = 'post_date', order: str = 'desc',
+                 date_from: str = None, date_to: str = None):
         offset = (page - 1) * per_page
-        where_clauses = []
-        params = []
-        if subreddit:
-            where_clauses.append("subreddit = ?")
-            params.append(subreddit)
-        if search:
-            where_clauses.append("(url LIKE ? OR post_id LIKE ?)")
-            params.extend([f'%{search}%', f'%{search}%'])
-        where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        where_sql, params = self._build_where(subreddit, search, date_from, date_to)
         
         # Validate sort column to prevent SQL injection
         valid_columns = ['url', 'post_date', 'subreddit', 'post_id']
@@ -124,12 +593,36 @@ class Database:
             sort = 'post_date'
         order_dir = 'ASC' if order.lower() == 'asc' else 'DESC'
         
-        cursor.execute(f"SELECT COUNT(*) as total FROM urls{where_sql}", params)
-        total = cursor.fetchone()['total']
-        cursor.execute(f"""
-            SELECT * FROM urls{where_sql} ORDER BY {sort} {order_dir} LIMIT ? OFFSET ?
-        """, params + [per_page, offset])
-        rows = cursor.fetchall()
+        total = 0
+        sources = []
+        for conn in self._sources(date_from, date_to):
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) as total FROM urls{where_sql}", params)
+            count = cursor.fetchone()['total']
+            if count:
+                total += count
+                sources.append(conn)
+        
+        if len(sources) <= 1:
+            rows = []
+            if sources:
+                cursor = sources[0].cursor()
+                cursor.execute(f"""
+                    SELECT * FROM urls{where_sql} ORDER BY {sort} {order_dir} LIMIT ? OFFSET ?
+                """, params + [per_page, offset])
+                rows = cursor.fetchall()
+        else:
+            # Each source returns its own first offset + per_page rows; merging them gives the page
+            ordered = []
+            for conn in sources:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT * FROM urls{where_sql} ORDER BY {sort} {order_dir} LIMIT ?
+                """, params + [offset + per_page])
+                ordered.append(cursor.fetchall())
+            merged = heapq.merge(*ordered, key=lambda row: row[sort], reverse=order_dir == 'DESC')
+            rows = list(itertools.islice(merged, offset, offset + per_page))
+        
         return {
             'urls': [dict(row) for row in rows],
             'total': total,
@@ -139,11 +632,17 @@ class Database:
         }
     
     def get_subreddits(self):
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT subreddit, COUNT(*) as count FROM urls GROUP BY subreddit ORDER BY count DESC
-        """)
-        return [{'name': row['subreddit'], 'count': row['count']} for row in cursor.fetchall()]
+        counts = Counter()
+        for conn in self._sources():
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT subreddit, COUNT(*) as count FROM urls GROUP BY subreddit
+            """)
+            for row in cursor.fetchall():
+                counts[row['subreddit']] += row['count']
+        return [{'name': name, 'count': count} for name, count in counts.most_common()]
     
     def close(self):
-        self.conn.close()
+        for path in list(self._partition_conns):
+            self._close_partition(path)
+        self.conn.close()
\ No newline at end of file
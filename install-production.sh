@@ -123,32 +123,31 @@ WantedBy=multi-user.target
 SERVICEEOF
 
 # ============================================
-# 5. Create daily scraper timer
+# 5. Create scraper scheduler service
 # ============================================
-print_status "Creating daily scraper timer..."
-cat > /etc/systemd/system/reddit-scraper-daily.service << DAILYEOF
+print_status "Creating scraper scheduler service..."
+# The scheduler replaces the old fixed 9 AM timer
+if [ -f /etc/systemd/system/reddit-scraper-daily.timer ]; then
+    systemctl disable --now reddit-scraper-daily.timer 2>/dev/null || true
+    rm -f /etc/systemd/system/reddit-scraper-daily.timer /etc/systemd/system/reddit-scraper-daily.service
+fi
+
+cat > /etc/systemd/system/reddit-scraper-scheduler.service << SCHEDULEREOF
 [Unit]
-Description=Reddit URL Scraper Daily Fetch
+Description=Reddit URL Scraper Adaptive Scheduler
 After=network.target
 
 [Service]
-Type=oneshot
+Type=simple
 User=$APP_USER
 WorkingDirectory=$APP_DIR
-ExecStart=$APP_DIR/venv/bin/python reddit_scraper_noauth.py --daily --subreddits SideProject
-DAILYEOF
-
-cat > /etc/systemd/system/reddit-scraper-daily.timer << TIMEREOF
-[Unit]
-Description=Run Reddit Scraper Daily at 9 AM
-
-[Timer]
-OnCalendar=*-*-* 09:00:00
-Persistent=true
+ExecStart=$APP_DIR/venv/bin/python reddit_scraper_noauth.py --schedule --subreddits SideProject
+Restart=always
+RestartSec=30
 
 [Install]
-WantedBy=timers.target
-TIMEREOF
+WantedBy=multi-user.target
+SCHEDULEREOF
 
 # ============================================
 # 6. Configure nginx
@@ -194,8 +193,8 @@ print_status "Starting services..."
 systemctl daemon-reload
 systemctl enable reddit-scraper
 systemctl start reddit-scraper
-systemctl enable reddit-scraper-daily.timer
-systemctl start reddit-scraper-daily.timer
+systemctl enable reddit-scraper-scheduler
+systemctl start reddit-scraper-scheduler
 systemctl restart nginx
 
 # ============================================
@@ -221,6 +220,6 @@ echo "📋 Useful commands:"
 echo "   sudo systemctl status reddit-scraper    # Check status"
 echo "   sudo systemctl restart reddit-scraper   # Restart app"
 echo "   sudo journalctl -u reddit-scraper -f    # View logs"
-echo "   sudo systemctl list-timers              # Check daily timer"
+echo "   sudo journalctl -u reddit-scraper-scheduler -f  # Scheduler logs"
 echo ""
 echo "============================================"
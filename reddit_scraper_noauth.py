@@ -4,11 +4,21 @@ import requests
 import re
 import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Set, Dict
+from typing import List, Set, Dict, Optional
 import argparse
+import functools
+import hashlib
+import os
+import socket
 import sys
+import threading
 import io
+from multiprocessing import Pool
 from database import Database
+from archive import ResponseArchive, reprocess_segment
+from scheduler import PollScheduler, RequestBudget
+from repair import apply_rules
+from resolver import LinkResolver
 
 # Fix Unicode encoding for Windows console
 if sys.platform == 'win32':
@@ -43,6 +53,9 @@ class RedditURLScraperNoAuth:
         'redd.it', 'i.redd.it', 'v.redd.it', 'reddit.app.link', 'preview.redd.it'
     }
     
+    BASE_URL = 'https://www.reddit.com'
+    PAGE_LIMIT = 100
+    
     ENDPOINTS = [
         ('new', {}),
         ('top', {'t': 'day'}),
@@ -53,34 +66,38 @@ class RedditURLScraperNoAuth:
         ('rising', {}),
     ]
     
-    def __init__(self):
+    def __init__(self, archive_dir: str = None, db_path: Optional[str] = 'reddit_urls.db'):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
-        self.db = Database()
+        # Workers pass db_path=None: they only talk to the coordinator
+        self.db = Database(db_path) if db_path else None
+        self.archive = ResponseArchive(archive_dir) if archive_dir else None
+        self.budget = None
     
-    def extract_urls_from_text(self, text: str) -> Set[str]:
+    @classmethod
+    def extract_urls_from_text(cls, text: str) -> Set[str]:
         
         if not text:
             return set()
         
-        urls = self.URL_PATTERN.findall(text)
+        urls = cls.URL_PATTERN.findall(text)
         
         # Also find bare domains like "domain.com"
-        bare_domains = self.BARE_DOMAIN_PATTERN.findall(text)
+        bare_domains = cls.BARE_DOMAIN_PATTERN.findall(text)
         urls.extend(bare_domains)
         
         # Also find bare domains like "domain.com"
-        bare_domains = self.BARE_DOMAIN_PATTERN.findall(text)
+        bare_domains = cls.BARE_DOMAIN_PATTERN.findall(text)
         urls.extend(bare_domains)
         
         # Also find bare domains like "domain.com"
-        bare_domains = self.BARE_DOMAIN_PATTERN.findall(text)
+        bare_domains = cls.BARE_DOMAIN_PATTERN.findall(text)
         urls.extend(bare_domains)
         
         # Also find bare domains like "domain.com"
-        bare_domains = self.BARE_DOMAIN_PATTERN.findall(text)
+        bare_domains = cls.BARE_DOMAIN_PATTERN.findall(text)
         urls.extend(bare_domains)
         
         normalized = set()
@@ -104,29 +121,48 @@ class RedditURLScraperNoAuth:
             if not url.startswith('http'):
                 url = 'http://' + url
             
-            if url.startswith('http') and not self._is_reddit_url(url):
+            # Same rules the repair job applies to stored rows
+            url = apply_rules(url)
+            
+            if url and url.startswith('http') and not cls._is_reddit_url(url):
                 normalized.add(url)
         
         return normalized
     
-    def _is_reddit_url(self, url: str) -> bool:
+    @classmethod
+    def extract_post_urls(cls, post: Dict) -> Set[str]:
+        
+        urls = cls.extract_urls_from_text(post.get('title', ''))
+        urls.update(cls.extract_urls_from_text(post.get('selftext', '')))
+        
+        post_url = apply_rules(post.get('url') or '')
+        if post_url and not cls._is_reddit_url(post_url):
+            urls.add(post_url)
+        
+        return urls
+    
+    @classmethod
+    def _is_reddit_url(cls, url: str) -> bool:
         
         url_lower = url.lower()
-        return any(domain in url_lower for domain in self.REDDIT_DOMAINS)
+        return any(domain in url_lower for domain in cls.REDDIT_DOMAINS)
     
     def _fetch_endpoint(self, subreddit: str, endpoint: str, params: dict, 
-                        max_pages: int = 10) -> List[Dict]:
+                        max_pages: int = 10, stop_before: float = None) -> List[Dict]:
+        # stop_before: for time-ordered listings (/new), stop paging once a page reaches posts older than it
         
         posts = []
         after = None
-        base_url = f"https://www.reddit.com/r/{subreddit}/{endpoint}.json"
+        base_url = f"{self.BASE_URL}/r/{subreddit}/{endpoint}.json"
         
         for page in range(max_pages):
-            req_params = {'limit': 100, **params}
+            req_params = {'limit': self.PAGE_LIMIT, **params}
             if after:
                 req_params['after'] = after
             
             try:
+                if self.budget:
+                    self.budget.acquire()
                 response = self.session.get(base_url, params=req_params, timeout=15)
                 
                 if response.status_code == 429:
@@ -140,6 +176,10 @@ class RedditURLScraperNoAuth:
                 # Force UTF-8 encoding for Windows compatibility
                 response.encoding = 'utf-8'
                 data = response.json()
+                
+                if self.archive:
+                    self.archive.append(subreddit, endpoint, req_params, data)
+                
                 page_posts = data.get('data', {}).get('children', [])
                 
                 if not page_posts:
@@ -151,7 +191,11 @@ class RedditURLScraperNoAuth:
                 if not after:
                     break
                 
-                time.sleep(2)
+                if stop_before and page_posts[-1]['data'].get('created_utc', 0) < stop_before:
+                    break
+                
+                if not self.budget:
+                    time.sleep(2)
                 
             except Exception as e:
                 print(f"    ⚠️ Error: {e}")
@@ -159,6 +203,46 @@ class RedditURLScraperNoAuth:
         
         return posts
     
+    @staticmethod
+    def _content_hash(post: Dict) -> str:
+        
+        content = '\x00'.join([post.get('title') or '', post.get('selftext') or '', post.get('url') or ''])
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+    
+    def _ingest_posts(self, subreddit: str, posts: List[Dict], since_ts: float = None) -> Dict:
+        
+        # Posts already processed with the same content are skipped before extraction
+        processed = self.db.load_post_index(subreddit, since_ts=since_ts)
+        
+        rows = []
+        post_rows = []
+        skipped = 0
+        
+        for post in posts:
+            post_id = post['id']
+            content_hash = self._content_hash(post)
+            if processed.get(post_id) == content_hash:
+                skipped += 1
+                continue
+            
+            post_time = post.get('created_utc', 0)
+            post_date = datetime.fromtimestamp(post_time, timezone.utc).replace(tzinfo=None)
+            edited = post.get('edited') or None
+            
+            for url in self.extract_post_urls(post):
+                rows.append((url, subreddit, post_id, post_date))
+            post_rows.append((post_id, subreddit, post_time, edited, content_hash))
+        
+        new_urls = self.db.add_urls(rows)
+        # Marked only after the URLs are stored, so a crash just means re-extraction
+        self.db.mark_posts_processed(post_rows)
+        
+        return {
+            'new_urls': new_urls,
+            'duplicates': len(rows) - new_urls,
+            'skipped': skipped
+        }
+    
     def scrape_subreddit_full(self, subreddit: str, days_back: int = None,
                              since_timestamp: float = None) -> Dict:
         
@@ -196,35 +280,24 @@ class RedditURLScraperNoAuth:
         
         print(f"\n  💾 Processing {len(all_posts)} unique posts...")
         
-        new_urls = 0
-        duplicates = 0
         oldest_date = None
         newest_date = None
         
-        for post_id, post in all_posts.items():
-            post_time = post.get('created_utc', 0)
-            post_date = datetime.fromtimestamp(post_time, timezone.utc)
+        for post in all_posts.values():
+            post_date = datetime.fromtimestamp(post.get('created_utc', 0), timezone.utc)
             
             if oldest_date is None or post_date < oldest_date:
                 oldest_date = post_date
             if newest_date is None or post_date > newest_date:
                 newest_date = post_date
-            
-            urls = self.extract_urls_from_text(post.get('title', ''))
-            urls.update(self.extract_urls_from_text(post.get('selftext', '')))
-            
-            post_url = post.get('url', '')
-            if post_url and not self._is_reddit_url(post_url):
-                urls.add(post_url)
-            
-            for url in urls:
-                if self.db.add_url(url, subreddit, post_date.replace(tzinfo=None), post_id):
-                    new_urls += 1
-                else:
-                    duplicates += 1
+        
+        result = self._ingest_posts(subreddit, list(all_posts.values()), since_ts=cutoff_ts)
+        new_urls = result['new_urls']
+        duplicates = result['duplicates']
         
         stats = {
             'posts_processed': len(all_posts),
+            'posts_skipped': result['skipped'],
             'new_urls': new_urls,
             'duplicates': duplicates,
             'oldest_date': oldest_date,
@@ -236,11 +309,11 @@ class RedditURLScraperNoAuth:
             days_covered = (newest_date - oldest_date).days
             date_range = f" ({oldest_date.strftime('%Y-%m-%d')} to {newest_date.strftime('%Y-%m-%d')}, {days_covered} days)"
         
-        print(f"  ✅ r/{subreddit}: {len(all_posts)} posts, {new_urls} new URLs, {duplicates} duplicates{date_range}")
+        print(f"  ✅ r/{subreddit}: {len(all_posts)} posts ({result['skipped']} unchanged), {new_urls} new URLs, {duplicates} duplicates{date_range}")
         
         return stats
     
-    def scrape_subreddit_daily(self, subreddit: str) -> Dict:
+    def scrape_subreddit_daily(self, subreddit: str, max_pages: int = 10) -> Dict:
         
         last_ts = self.db.get_last_scrape_timestamp(subreddit)
         
@@ -251,44 +324,32 @@ class RedditURLScraperNoAuth:
             print(f"\n🔍 First daily scrape r/{subreddit} (last 24 hours)...")
             last_ts = (datetime.now(timezone.utc) - timedelta(days=1)).timestamp()
         
-        posts = self._fetch_endpoint(subreddit, 'new', {}, max_pages=10)
+        posts = self._fetch_endpoint(subreddit, 'new', {}, max_pages=max_pages, stop_before=last_ts)
+        # Reaching older posts (or the end of the listing) means nothing since last_ts was missed
+        cutoff_reached = (
+            len(posts) < max_pages * self.PAGE_LIMIT
+            or posts[-1]['data'].get('created_utc', 0) < last_ts
+        )
         
-        new_urls = 0
-        duplicates = 0
-        posts_in_range = 0
+        posts_in_range = [
+            post_data['data'] for post_data in posts
+            if post_data['data'].get('created_utc', 0) >= last_ts
+        ]
         
-        for post_data in posts:
-            post = post_data['data']
-            post_time = post.get('created_utc', 0)
-            
-            if post_time < last_ts:
-                continue
-            
-            posts_in_range += 1
-            post_date = datetime.fromtimestamp(post_time, timezone.utc)
-            post_id = post['id']
-            
-            urls = self.extract_urls_from_text(post.get('title', ''))
-            urls.update(self.extract_urls_from_text(post.get('selftext', '')))
-            
-            post_url = post.get('url', '')
-            if post_url and not self._is_reddit_url(post_url):
-                urls.add(post_url)
-            
-            for url in urls:
-                if self.db.add_url(url, subreddit, post_date.replace(tzinfo=None), post_id):
-                    new_urls += 1
-                else:
-                    duplicates += 1
+        result = self._ingest_posts(subreddit, posts_in_range, since_ts=last_ts)
+        new_urls = result['new_urls']
+        duplicates = result['duplicates']
         
         self.db.update_last_scrape(subreddit)
         
-        print(f"  ✅ r/{subreddit}: {posts_in_range} new posts, {new_urls} new URLs, {duplicates} duplicates")
+        print(f"  ✅ r/{subreddit}: {len(posts_in_range)} new posts ({result['skipped']} unchanged), {new_urls} new URLs, {duplicates} duplicates")
         
         return {
-            'posts_processed': posts_in_range,
+            'posts_processed': len(posts_in_range),
+            'posts_skipped': result['skipped'],
             'new_urls': new_urls,
-            'duplicates': duplicates
+            'duplicates': duplicates,
+            'cutoff_reached': cutoff_reached
         }
     
     def backfill(self, subreddits: List[str], days: int):
@@ -332,6 +393,150 @@ class RedditURLScraperNoAuth:
         
         return total_urls
     
+    def schedule(self, subreddits: List[str], requests_per_minute: float = 30):
+        
+        self.budget = RequestBudget(requests_per_minute)
+        PollScheduler(self, subreddits).run()
+    
+    def run_worker(self, coordinator_url: str, worker_id: str = None, batch_size: int = 1000):
+        
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        coordinator_url = coordinator_url.rstrip('/')
+        token = os.environ.get('COORDINATOR_TOKEN', '')
+        
+        # Separate sessions so coordinator calls don't carry Reddit headers;
+        # requests.Session isn't thread-safe, so the heartbeat thread gets its own
+        def rpc_session():
+            session = requests.Session()
+            if token:
+                session.headers['X-Coordinator-Token'] = token
+            return session
+        
+        def call(path, payload, session=None):
+            response = (session or rpc).post(f"{coordinator_url}{path}", json=payload, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        
+        rpc = rpc_session()
+        
+        print(f"\n{'='*60}")
+        print(f"🛰️  WORKER MODE - {worker_id} -> {coordinator_url}")
+        print(f"{'='*60}")
+        
+        total_urls = 0
+        
+        while True:
+            reply = call('/lease', {'worker': worker_id})
+            item = reply['item']
+            if not item:
+                # Leased items may still expire and come back
+                if reply['leased'] == 0:
+                    break
+                time.sleep(15)
+                continue
+            
+            endpoint_name = item['endpoint'] + (f"/{item['params']['t']}" if item['params'].get('t') else "")
+            print(f"\n  📡 r/{item['subreddit']} /{endpoint_name} (item {item['id']})")
+            
+            stop = threading.Event()
+            
+            def heartbeat():
+                with rpc_session() as session:
+                    while not stop.wait(item['lease_ttl'] / 3):
+                        try:
+                            call('/heartbeat', {'item': item['id'], 'worker': worker_id}, session)
+                        except requests.RequestException:
+                            pass
+            
+            beat = threading.Thread(target=heartbeat, daemon=True)
+            beat.start()
+            
+            try:
+                posts = self._fetch_endpoint(item['subreddit'], item['endpoint'], item['params'],
+                                             max_pages=item['max_pages'])
+                rows = set()
+                posts_in_range = 0
+                for post_data in posts:
+                    post = post_data['data']
+                    post_time = post.get('created_utc', 0)
+                    if item['cutoff_ts'] and post_time < item['cutoff_ts']:
+                        continue
+                    posts_in_range += 1
+                    for url in self.extract_post_urls(post):
+                        rows.add((url, post['id'], post_time))
+                
+                rows = list(rows)
+                new_urls = 0
+                for i in range(0, len(rows), batch_size):
+                    new_urls += call('/results', {'item': item['id'], 'worker': worker_id, 'rows': rows[i:i + batch_size]})['new_urls']
+                call('/complete', {'item': item['id'], 'worker': worker_id, 'posts': posts_in_range})
+                total_urls += new_urls
+                print(f"    ✅ {posts_in_range} posts, {new_urls} new URLs")
+            except Exception as e:
+                print(f"    ⚠️ Error: {e}")
+                try:
+                    call('/fail', {'item': item['id'], 'worker': worker_id, 'error': str(e)})
+                except requests.RequestException:
+                    pass
+            finally:
+                stop.set()
+        
+        print(f"\n{'='*60}")
+        print(f"✨ Queue drained - {total_urls} new URLs from this worker")
+        print(f"{'='*60}\n")
+        
+        return total_urls
+    
+    def reprocess(self, archive_dir: str, subreddits: List[str] = None, workers: int = None):
+        
+        archive = ResponseArchive(archive_dir)
+        segments = archive.segments()
+        
+        print(f"\n{'='*60}")
+        print(f"♻️  REPROCESS MODE - {len(segments)} archived segments")
+        print(f"{'='*60}")
+        
+        total_urls = 0
+        total_rows = 0
+        
+        # Extraction is CPU-bound and runs per segment in parallel;
+        # inserts stay in this process since SQLite has a single writer
+        with Pool(processes=workers) as pool:
+            results = pool.imap_unordered(
+                functools.partial(reprocess_segment, subreddits=subreddits), segments
+            )
+            for rows in results:
+                new_urls = self.db.add_urls(rows)
+                total_urls += new_urls
+                total_rows += len(rows)
+                print(f"  ✅ {len(rows)} URLs extracted, {new_urls} new")
+        
+        print(f"\n{'='*60}")
+        print(f"✨ SUMMARY")
+        print(f"   URLs extracted: {total_rows}")
+        print(f"   New URLs found: {total_urls}")
+        print(f"{'='*60}\n")
+        
+        return total_urls
+    
+    def maintain_partitions(self, hot_months: int = None, archive_after_months: int = None):
+        
+        if hot_months:
+            print(f"\n🗂️  Moving rows older than {hot_months} months into monthly partitions...")
+            moved = self.db.roll_partitions(hot_months)
+            for month, count in moved.items():
+                print(f"  ✅ {month}: {count} URLs")
+            if not moved:
+                print("  ✅ Nothing to move")
+        
+        if archive_after_months:
+            print(f"\n🗜️  Compacting partitions older than {archive_after_months} months...")
+            compacted = self.db.compact_partitions(archive_after_months)
+            for month in compacted:
+                print(f"  ✅ {month} archived (read-only)")
+            if not compacted:
+                print("  ✅ Nothing to compact")
+    
     def export_csv(self, output_file='reddit_urls.csv'):
         
         count = self.db.export_to_csv(output_file)
@@ -346,8 +551,8 @@ class RedditURLScraperNoAuth:
         print(f"📊 DATABASE STATISTICS")
         print(f"{'='*60}")
         print(f"Total URLs: {stats['total_urls']}")
-        print(f"Subreddits tracked: {stats['subreddit_count']}")
-        print(f"Date range: {stats['earliest_post']} to {stats['latest_post']}")
+        print(f"Subreddits tracked: {stats['subreddits']}")
+        print(f"Date range: {stats['oldest_post']} to {stats['newest_post']}")
         print(f"{'='*60}\n")
 
 def main():
@@ -361,29 +566,59 @@ def main():
                        help='Backfill mode: scrape last N days (uses all endpoints)')
     parser.add_argument('--daily', action='store_true',
                        help='Daily mode: scrape new posts since last run')
+    parser.add_argument('--schedule', action='store_true',
+                       help='Scheduler mode: keep polling each subreddit at its own learned rate')
+    parser.add_argument('--budget', type=float, default=30, metavar='RPM',
+                       help='Request budget for --schedule in requests per minute (default: 30)')
+    parser.add_argument('--worker', metavar='URL',
+                       help='Worker mode: take work from the coordinator at URL until its queue is empty')
+    parser.add_argument('--worker-id', metavar='ID',
+                       help='Worker name reported to the coordinator (default: host-pid)')
     parser.add_argument('--subreddits', nargs='+', metavar='SUB',
                        help='List of subreddits to scrape')
+    parser.add_argument('--resolve-links', action='store_true',
+                       help='Resolve shortener/redirect URLs to their final target (runs after scraping)')
+    parser.add_argument('--resolve-concurrency', type=int, default=16, metavar='N',
+                       help='Concurrent requests for --resolve-links (default: 16)')
+    parser.add_argument('--resolve-hosts', nargs='+', metavar='HOST',
+                       help='Hosts to resolve instead of the built-in shortener list')
     parser.add_argument('--export', metavar='FILE',
                        help='Export URLs to CSV file')
     parser.add_argument('--stats', action='store_true',
                        help='Show database statistics')
+    parser.add_argument('--archive', metavar='DIR',
+                       help='Archive raw listing pages to DIR while scraping')
+    parser.add_argument('--reprocess', metavar='DIR',
+                       help='Re-extract URLs from an archive in DIR (no network)')
+    parser.add_argument('--workers', type=int, metavar='N',
+                       help='Worker processes for --reprocess (default: CPU count)')
+    parser.add_argument('--partition-older-than', type=int, metavar='MONTHS',
+                       help='Move rows older than the last N months into monthly partition files')
+    parser.add_argument('--compact-older-than', type=int, metavar='MONTHS',
+                       help='Compact partitions older than N months into read-only archives')
     
     args = parser.parse_args()
     
-    if args.backfill and args.daily:
-        print("❌ Error: Cannot use --backfill and --daily together")
+    if sum(bool(mode) for mode in [args.backfill, args.daily, args.schedule]) > 1:
+        print("❌ Error: Use only one of --backfill, --daily and --schedule")
         sys.exit(1)
     
-    if (args.backfill or args.daily) and not args.subreddits:
+    if (args.backfill or args.daily or args.schedule) and not args.subreddits:
         print("❌ Error: --subreddits required")
         sys.exit(1)
     
-    if not any([args.backfill, args.daily, args.export, args.stats]):
+    if not any([args.backfill, args.daily, args.schedule, args.worker, args.resolve_links, args.export, args.stats, args.reprocess,
+                args.partition_older_than, args.compact_older_than]):
         parser.print_help()
         sys.exit(0)
     
     try:
-        scraper = RedditURLScraperNoAuth()
+        needs_db = any([args.backfill, args.daily, args.schedule, args.resolve_links, args.export, args.stats, args.reprocess,
+                        args.partition_older_than, args.compact_older_than])
+        scraper = RedditURLScraperNoAuth(archive_dir=args.archive, db_path='reddit_urls.db' if needs_db else None)
+        
+        if args.reprocess:
+            scraper.reprocess(args.reprocess, subreddits=args.subreddits, workers=args.workers)
         
         if args.backfill:
             scraper.backfill(args.subreddits, args.backfill)
@@ -391,6 +626,18 @@ def main():
         if args.daily:
             scraper.daily_update(args.subreddits)
         
+        if args.schedule:
+            scraper.schedule(args.subreddits, requests_per_minute=args.budget)
+        
+        if args.worker:
+            scraper.run_worker(args.worker, worker_id=args.worker_id)
+        
+        if args.resolve_links:
+            LinkResolver(scraper.db, hosts=args.resolve_hosts, concurrency=args.resolve_concurrency).run()
+        
+        if args.partition_older_than or args.compact_older_than:
+            scraper.maintain_partitions(args.partition_older_than, args.compact_older_than)
+        
         if args.export:
             scraper.export_csv(args.export)
         
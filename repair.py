@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+import time
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from database import Database
+
+
+# candidate_sql cheaply selects rows the rule may touch; repair() returns the fixed URL, or None to drop it
+class RepairRule:
+    name = ''
+    candidate_sql = '1'
+
+    def repair(self, url: str) -> Optional[str]:
+        return url
+
+
+class MarkdownLinkRule(RepairRule):
+    # "https://site.com](https://site.com)" left over from markdown links
+    name = 'markdown_link'
+    candidate_sql = "url LIKE '%](%'"
+
+    def repair(self, url: str) -> Optional[str]:
+        if '](' not in url:
+            return url
+        if '](http' not in url:
+            return None
+
+        clean_url = url.split('](')[1].rstrip(')')
+        clean_url = clean_url.split(')')[0].split('<')[0].split('!')[0]
+        return clean_url if clean_url.startswith('http') else None
+
+
+RULES: List[RepairRule] = [MarkdownLinkRule()]
+
+
+def register_rule(rule: RepairRule):
+    RULES.append(rule)
+
+
+def apply_rules(url: str, rules: List[RepairRule] = None) -> Optional[str]:
+    for rule in rules or RULES:
+        url = rule.repair(url)
+        if url is None:
+            return None
+    return url
+
+
+# Set-based repair over id-range chunks, each chunk its own short transaction
+class RepairEngine:
+    def __init__(self, db: Database, rules: List[RepairRule] = None, chunk_size: int = 5000):
+        self.db = db
+        self.conn = db.conn
+        self.rules = rules or RULES
+        self.chunk_size = chunk_size
+        self._create_tables()
+
+    def _create_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS repair_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                state TEXT NOT NULL DEFAULT 'running',
+                rules TEXT NOT NULL,
+                processed INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                fixed INTEGER NOT NULL DEFAULT 0,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                started_at REAL,
+                updated_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def start_job(self, stale_after: float = 300) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        # (new job id, None), or (None, running job); the check and insert share one
+        # write transaction so two requests can't both start a job
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            running = self.running_job(stale_after)
+            if running:
+                self.conn.commit()
+                return None, running
+            now = time.time()
+            cursor.execute("""
+                INSERT INTO repair_jobs (rules, started_at, updated_at) VALUES (?, ?, ?)
+            """, (','.join(rule.name for rule in self.rules), now, now))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return cursor.lastrowid, None
+
+    def get_job(self, job_id: int = None) -> Optional[Dict[str, Any]]:
+        cursor = self.conn.cursor()
+        if job_id:
+            cursor.execute("SELECT * FROM repair_jobs WHERE id = ?", (job_id,))
+        else:
+            cursor.execute("SELECT * FROM repair_jobs ORDER BY id DESC LIMIT 1")
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def running_job(self, stale_after: float = 300) -> Optional[Dict[str, Any]]:
+        job = self.get_job()
+        if job and job['state'] == 'running' and job['updated_at'] > time.time() - stale_after:
+            return job
+        return None
+
+    def _update_job(self, job_id: int, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        self.conn.execute(f"UPDATE repair_jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+        self.conn.commit()
+
+    def _repair_chunk(self, conn, rule: RepairRule, lo: int, hi: int) -> Dict[str, int]:
+        cursor = conn.cursor()
+        where = f"id >= ? AND id < ? AND ({rule.candidate_sql})"
+        # Rows whose repaired URL already exists for the same post are duplicates
+        duplicate_sql = f"""
+            DELETE FROM urls WHERE {where} AND repair_url(url) != url AND EXISTS (
+                SELECT 1 FROM urls AS other
+                WHERE other.url = repair_url(urls.url)
+                  AND other.subreddit = urls.subreddit AND other.post_id = urls.post_id
+            )
+        """
+
+        cursor.execute(f"DELETE FROM urls WHERE {where} AND repair_url(url) IS NULL", (lo, hi))
+        deleted = cursor.rowcount
+        cursor.execute(duplicate_sql, (lo, hi))
+        deleted += cursor.rowcount
+        cursor.execute(f"""
+            UPDATE OR IGNORE urls SET url = repair_url(url), canonical_url = NULL
+            WHERE {where} AND repair_url(url) != url
+        """, (lo, hi))
+        fixed = cursor.rowcount
+        # Two bad rows in this chunk can repair to the same URL; the second one was ignored above
+        cursor.execute(duplicate_sql, (lo, hi))
+        deleted += cursor.rowcount
+        conn.commit()
+        return {'fixed': fixed, 'deleted': deleted}
+
+    def _unarchive_dirty(self):
+        # Archives are read-only; months with rows a rule would change become writable again
+        for month, conn in self.db.archived_partitions():
+            for rule in self.rules:
+                conn.create_function('repair_url', 1, rule.repair, deterministic=True)
+                cursor = conn.execute(f"""
+                    SELECT 1 FROM urls WHERE ({rule.candidate_sql}) AND repair_url(url) IS NOT url LIMIT 1
+                """)
+                if cursor.fetchone():
+                    self.db.unarchive_partition(month)
+                    break
+
+    def run(self, job_id: int = None, progress: Callable[[Dict[str, int]], None] = None) -> Dict[str, int]:
+        self._unarchive_dirty()
+        # (connection, first id, last id + 1) for the hot table and each writable partition
+        sources = []
+        for conn in self.db.writable_connections():
+            row = conn.execute("SELECT MIN(id) as lo, MAX(id) as hi FROM urls").fetchone()
+            if row['lo'] is not None:
+                sources.append((conn, row['lo'], row['hi'] + 1))
+        total = sum(hi - lo for _, lo, hi in sources) * len(self.rules)
+        counts = {'processed': 0, 'total': total, 'fixed': 0, 'deleted': 0}
+
+        try:
+            for rule in self.rules:
+                for conn, lo, hi in sources:
+                    conn.create_function('repair_url', 1, rule.repair, deterministic=True)
+                    for start in range(lo, hi, self.chunk_size):
+                        result = self._repair_chunk(conn, rule, start, min(start + self.chunk_size, hi))
+                        counts['fixed'] += result['fixed']
+                        counts['deleted'] += result['deleted']
+                        if result['fixed'] or result['deleted']:
+                            self.db.bump_data_version()
+                        counts['processed'] += min(self.chunk_size, hi - start)
+                        if job_id:
+                            self._update_job(job_id, **counts)
+                        if progress:
+                            progress(counts)
+        except Exception as e:
+            for conn, _, _ in sources:
+                conn.rollback()
+            if job_id:
+                self._update_job(job_id, state='failed', error=str(e))
+            raise
+
+        if job_id:
+            self._update_job(job_id, state='done', **counts)
+        return counts
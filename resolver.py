@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+import requests
+from database import Database
+
+SHORTENER_HOSTS = {
+    'bit.ly', 'bitly.com', 't.co', 'amzn.to', 'amzn.eu', 'a.co', 'tinyurl.com', 'goo.gl',
+    'ow.ly', 'buff.ly', 'lnkd.in', 'rebrand.ly', 'is.gd', 'v.gd', 'cutt.ly', 'shorturl.at',
+    'tiny.cc', 'rb.gy', 'bl.ink', 'short.io', 'shorte.st', 'adf.ly', 'linktr.ee', 'fb.me',
+    'dlvr.it', 'ift.tt', 'trib.al', 'youtu.be', 'spoti.fi', 'apple.co', 'git.io', 's.id'
+}
+
+
+# Resolves shortener URLs into urls.canonical_url, cached in url_resolutions
+class LinkResolver:
+    def __init__(self, db: Database, hosts: Iterable[str] = None, concurrency: int = 16,
+                 per_host_interval: float = 1.0, timeout: float = 10, ttl_days: float = 30,
+                 error_ttl_days: float = 1, max_redirects: int = 10):
+        self.db = db
+        self.conn = db.conn
+        self.hosts = {host.lower() for host in (hosts or SHORTENER_HOSTS)}
+        self.concurrency = concurrency
+        self.per_host_interval = per_host_interval
+        self.timeout = timeout
+        self.ttl = ttl_days * 86400
+        self.error_ttl = error_ttl_days * 86400
+        self.max_redirects = max_redirects
+        self._local = threading.local()
+        self._create_tables()
+
+    def _create_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS url_resolutions (
+                url TEXT PRIMARY KEY,
+                resolved_url TEXT,
+                status_code INTEGER,
+                error TEXT,
+                resolved_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def _host_filter(self) -> Tuple[str, List[str]]:
+        clauses = []
+        params = []
+        for host in sorted(self.hosts):
+            for prefix in ('', 'www.'):
+                clauses.append("url LIKE ?")
+                params.append(f'%://{prefix}{host}/%')
+        return " OR ".join(clauses), params
+
+    def _tables(self) -> Iterator[str]:
+        # The hot table, then each writable partition attached as "part" so it can
+        # join url_resolutions; archived months are read-only and keep their values
+        yield 'main.urls'
+        for path in self.db.partition_paths(writable=True):
+            self.conn.commit()
+            self.conn.execute("ATTACH DATABASE ? AS part", (path,))
+            try:
+                yield 'part.urls'
+            finally:
+                self.conn.commit()
+                self.conn.execute("DETACH DATABASE part")
+
+    def pending_urls(self, limit: int = None) -> List[str]:
+        host_sql, params = self._host_filter()
+        now = time.time()
+        cursor = self.conn.cursor()
+        urls = {}
+        for table in self._tables():
+            # Skip URLs with a fresh cache entry; failures are retried sooner than successes,
+            # and successes older than the TTL are checked again in case the target moved
+            cursor.execute(f"""
+                SELECT DISTINCT url FROM {table} AS urls
+                WHERE ({host_sql})
+                  AND NOT EXISTS (
+                      SELECT 1 FROM main.url_resolutions r WHERE r.url = urls.url
+                        AND r.resolved_at > CASE WHEN r.resolved_url IS NULL THEN ? ELSE ? END
+                  )
+            """, params + [now - self.error_ttl, now - self.ttl])
+            urls.update(dict.fromkeys(row['url'] for row in cursor.fetchall()))
+        return list(urls)[:limit] if limit else list(urls)
+
+    def _session(self) -> requests.Session:
+        # requests sessions aren't guaranteed thread-safe; one per pool thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.max_redirects = self.max_redirects
+            session.headers['User-Agent'] = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+            self._local.session = session
+        return session
+
+    def _fetch(self, url: str) -> Dict:
+        session = self._session()
+        try:
+            response = session.head(url, allow_redirects=True, timeout=self.timeout)
+            # Some shorteners refuse HEAD; fall back to a GET without reading the body
+            if response.status_code in (400, 403, 405, 501):
+                response = session.get(url, allow_redirects=True, timeout=self.timeout, stream=True)
+                response.close()
+            return {'resolved_url': response.url, 'status_code': response.status_code, 'error': None}
+        except requests.RequestException as e:
+            return {'resolved_url': None, 'status_code': None, 'error': str(e)[:500]}
+
+    async def _resolve_all(self, urls: List[str]) -> Dict[str, Dict]:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        host_locks: Dict[str, asyncio.Lock] = {}
+        host_last: Dict[str, float] = {}
+        results = {}
+
+        async def resolve(url: str):
+            host = urlsplit(url).netloc.lower()
+            lock = host_locks.setdefault(host, asyncio.Lock())
+            # Pace per host before taking a slot, so links waiting on a busy host
+            # don't hold slots other hosts could use
+            async with lock:
+                wait = host_last.get(host, 0) + self.per_host_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                host_last[host] = time.monotonic()
+            async with semaphore:
+                results[url] = await loop.run_in_executor(executor, self._fetch, url)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            await asyncio.gather(*(resolve(url) for url in urls))
+        return results
+
+    def _store(self, results: Dict[str, Dict]):
+        now = time.time()
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO url_resolutions (url, resolved_url, status_code, error, resolved_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(url, r['resolved_url'], r['status_code'], r['error'], now) for url, r in results.items()])
+        self.conn.commit()
+
+    def _apply(self, results: Dict[str, Dict]) -> int:
+        # Failed re-checks keep the target found earlier
+        updates = [(r['resolved_url'], url, r['resolved_url']) for url, r in results.items() if r['resolved_url']]
+        cursor = self.conn.cursor()
+        updated = 0
+        for table in self._tables():
+            cursor.executemany(f"""
+                UPDATE {table} SET canonical_url = ? WHERE url = ? AND canonical_url IS NOT ?
+            """, updates)
+            updated += max(cursor.rowcount, 0)
+        if updated:
+            self.db.bump_data_version()
+        else:
+            self.conn.commit()
+        return updated
+
+    def _apply_cache(self) -> int:
+        # Copies cached targets onto rows stored since the link was resolved
+        cursor = self.conn.cursor()
+        updated = 0
+        for table in self._tables():
+            cursor.execute(f"""
+                UPDATE {table} AS urls SET canonical_url = (
+                    SELECT resolved_url FROM main.url_resolutions r WHERE r.url = urls.url
+                )
+                WHERE canonical_url IS NULL AND url IN (
+                    SELECT url FROM main.url_resolutions WHERE resolved_url IS NOT NULL
+                )
+            """)
+            updated += cursor.rowcount
+        if updated:
+            self.db.bump_data_version()
+        else:
+            self.conn.commit()
+        return updated
+
+    def resolve(self, url: str) -> Optional[str]:
+        return asyncio.run(self._resolve_all([url]))[url]['resolved_url']
+
+    def run(self, limit: int = None, batch_size: int = 500) -> Dict[str, int]:
+        counts = {'resolved': 0, 'failed': 0, 'updated': self._apply_cache()}
+        urls = self.pending_urls(limit)
+
+        print(f"\n🔗 Resolving {len(urls)} short links ({self.concurrency} concurrent)...")
+
+        for i in range(0, len(urls), batch_size):
+            results = asyncio.run(self._resolve_all(urls[i:i + batch_size]))
+            self._store(results)
+            counts['resolved'] += sum(1 for r in results.values() if r['resolved_url'])
+            counts['failed'] += sum(1 for r in results.values() if not r['resolved_url'])
+            counts['updated'] += self._apply(results)
+            print(f"  ✅ {min(i + batch_size, len(urls))}/{len(urls)} links checked")
+
+        print(f"  ✅ {counts['resolved']} resolved, {counts['failed']} failed, {counts['updated']} rows updated")
+        return counts
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+
+# Token bucket shared by every request the process makes
+class RequestBudget:
+    def __init__(self, requests_per_minute: float = 30, burst: int = 5):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Polls each subreddit's /new listing just often enough that a poll fits in one or two pages
+class PollScheduler:
+    MAX_PAGES = 10
+    DEFAULT_RATE = 1 / 3600.0  # posts/sec for a subreddit with no history
+    SEED_WINDOW_DAYS = 7
+
+    def __init__(self, scraper, subreddits: List[str], target_posts: int = 150,
+                 min_interval: float = 300, max_interval: float = 86400):
+        self.scraper = scraper
+        self.db = scraper.db
+        self.subreddits = subreddits
+        self.target_posts = target_posts
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def _seed_rate(self, subreddit: str) -> float:
+        since = datetime.now(timezone.utc) - timedelta(days=self.SEED_WINDOW_DAYS)
+        count = self.db.count_recent_posts(subreddit, since.replace(tzinfo=None))
+        if count:
+            return count / (self.SEED_WINDOW_DAYS * 86400.0)
+        return self.DEFAULT_RATE
+
+    def _interval(self, rate: float) -> float:
+        return max(self.min_interval, min(self.max_interval, self.target_posts / max(rate, 1e-9)))
+
+    def _observe(self, rate: float, last_poll: float, now: float, posts: int, cutoff_reached: bool) -> float:
+        elapsed = now - last_poll if last_poll else 0
+        if elapsed <= 0:
+            return rate
+
+        observed = posts / elapsed
+        # Running out of pages before the last poll's posts means some were missed,
+        # so the real rate is higher
+        if not cutoff_reached:
+            observed *= 2
+        return 0.5 * rate + 0.5 * observed
+
+    def _initial_queue(self) -> list:
+        now = time.time()
+        queue = []
+        for subreddit in self.subreddits:
+            state = self.db.get_poll_state(subreddit)
+            if state:
+                next_poll = state['next_poll']
+            else:
+                rate = self._seed_rate(subreddit)
+                last_ts = self.db.get_last_scrape_timestamp(subreddit)
+                next_poll = (last_ts + self._interval(rate)) if last_ts else now
+                self.db.save_poll_state(subreddit, rate, next_poll, last_ts)
+            heapq.heappush(queue, (next_poll, subreddit))
+        return queue
+
+    def run(self):
+        queue = self._initial_queue()
+
+        print(f"\n{'='*60}")
+        print(f"⏱️  SCHEDULER MODE - {len(self.subreddits)} subreddits")
+        print(f"{'='*60}")
+
+        while queue:
+            due, subreddit = queue[0]
+            wait = due - time.time()
+            if wait > 0:
+                time.sleep(min(wait, 60))
+                continue
+            heapq.heappop(queue)
+
+            state = self.db.get_poll_state(subreddit)
+            rate = state['post_rate'] if state else self._seed_rate(subreddit)
+            last_poll = state['last_poll'] if state else None
+
+            try:
+                stats = self.scraper.scrape_subreddit_daily(subreddit, max_pages=self.MAX_PAGES)
+                now = time.time()
+                rate = self._observe(rate, last_poll, now, stats['posts_processed'], stats['cutoff_reached'])
+                interval = self._interval(rate)
+                last_poll = now
+            except Exception as e:
+                print(f"  ⚠️ r/{subreddit}: {e}")
+                now = time.time()
+                interval = self.min_interval
+
+            next_poll = now + interval
+            self.db.save_poll_state(subreddit, rate, next_poll, last_poll)
+            heapq.heappush(queue, (next_poll, subreddit))
+            print(f"  ⏱️ r/{subreddit}: {rate * 3600:.1f} posts/h, next poll in {interval / 60:.0f} min")
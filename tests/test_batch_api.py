@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web_viewer
+from database import Database
+
+
+class BatchApiTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        web_viewer.DB_PATH = os.path.join(self.tmp, 'test.db')
+        db = Database(web_viewer.DB_PATH)
+        db.add_urls([
+            ('http://a.example.com', 'SideProject', 'p1', datetime(2025, 1, 5)),
+            ('http://b.example.com', 'SideProject', 'p2', datetime(2025, 2, 5)),
+            ('https://b.example.com', 'SideProject', 'p2', datetime(2025, 2, 5)),
+            ('http://c.example.com', 'startups', 'p3', datetime(2025, 3, 5)),
+        ])
+        db.close()
+        self.client = web_viewer.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def urls(self):
+        db = Database(web_viewer.DB_PATH)
+        rows = {row['url']: row['id'] for row in db.conn.execute("SELECT id, url FROM urls")}
+        db.close()
+        return rows
+
+    def post(self, path, body):
+        return self.client.post(path, json=body)
+
+    def test_delete_by_ids(self):
+        ids = self.urls()
+        response = self.post('/api/urls/batch-delete', {'ids': [ids['http://a.example.com'], 999]})
+        self.assertEqual(response.get_json()['deleted'], 1)
+        self.assertNotIn('http://a.example.com', self.urls())
+
+    def test_delete_by_filter(self):
+        response = self.post('/api/urls/batch-delete', {'filter': {'subreddit': 'SideProject', 'date_to': '2025-02-01'}})
+        self.assertEqual(response.get_json()['deleted'], 1)
+        self.assertEqual(len(self.urls()), 3)
+
+    def test_delete_rejects_bad_filters(self):
+        bad_bodies = [
+            {'filter': {}},
+            {'filter': {'subreddit': '', 'search': None}},
+            {'filter': {'subreddit': 'SideProject', 'date_to': 'Feb 2025'}},
+            {'filter': {'date_from': 20250101}},
+            {'filter': {'subreddit': ['SideProject']}},
+            {'filter': 'SideProject'},
+            {'ids': [True]},
+            {'ids': 'all'},
+            {},
+        ]
+        for body in bad_bodies:
+            with self.subTest(body=body):
+                self.assertEqual(self.post('/api/urls/batch-delete', body).status_code, 400)
+        self.assertEqual(self.client.post('/api/urls/batch-delete', data='[1]', content_type='application/json').status_code, 400)
+        self.assertEqual(len(self.urls()), 4)
+
+    def test_update_by_ids(self):
+        ids = self.urls()
+        response = self.post('/api/urls/batch-update', {'updates': [
+            {'id': ids['http://a.example.com'], 'url': 'https://a.example.com'},
+            # Would duplicate https://b.example.com for the same post
+            {'id': ids['http://b.example.com'], 'url': 'https://b.example.com'},
+        ]})
+        self.assertEqual(response.get_json(), {'updated': 1, 'skipped': 1, 'archived': 0})
+        self.assertIn('https://a.example.com', self.urls())
+
+    def test_update_by_filter(self):
+        response = self.post('/api/urls/batch-update', {
+            'filter': {'subreddit': 'SideProject'}, 'find': 'http://', 'replace': 'https://'
+        })
+        self.assertEqual(response.get_json()['updated'], 1)
+        urls = self.urls()
+        self.assertIn('https://a.example.com', urls)
+        self.assertIn('http://b.example.com', urls)
+        self.assertIn('http://c.example.com', urls)
+
+    def test_update_rejects_bad_input(self):
+        url_id = self.urls()['http://a.example.com']
+        bad_bodies = [
+            {'updates': [{'id': url_id, 'url': ['https://x.com']}]},
+            {'updates': [{'id': url_id, 'url': ''}]},
+            {'updates': [{'id': True, 'url': 'https://x.com'}]},
+            {'updates': []},
+            {'filter': {}, 'find': 'http://', 'replace': 'https://'},
+            {'filter': {'date_from': 'yesterday'}, 'find': 'http://', 'replace': 'https://'},
+            {'filter': {'subreddit': 'SideProject'}, 'find': '', 'replace': 'x'},
+            {'filter': {'subreddit': 'SideProject'}, 'find': 'http://'},
+        ]
+        for body in bad_bodies:
+            with self.subTest(body=body):
+                self.assertEqual(self.post('/api/urls/batch-update', body).status_code, 400)
+        self.assertEqual(sorted(self.urls()), [
+            'http://a.example.com', 'http://b.example.com', 'http://c.example.com', 'https://b.example.com'
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
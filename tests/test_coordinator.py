@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from werkzeug.serving import make_server
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import coordinator
+from coordinator import LeaseQueue
+from database import Database
+from reddit_scraper_noauth import RedditURLScraperNoAuth
+
+WORKER_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from reddit_scraper_noauth import RedditURLScraperNoAuth
+RedditURLScraperNoAuth.BASE_URL = sys.argv[2]
+RedditURLScraperNoAuth(db_path=None).run_worker(sys.argv[3], worker_id=sys.argv[4])
+"""
+
+
+class FakeRedditHandler(BaseHTTPRequestHandler):
+    # One page per listing: five posts shared by every endpoint plus one only this endpoint returns
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        endpoint = parts.path.rsplit('/', 1)[-1].replace('.json', '')
+        t = parse_qs(parts.query).get('t', ['all'])[0]
+        created = time.time() - 3600
+        posts = [
+            {'id': f"shared{i}", 'title': f"Check https://shared{i}.example.com", 'selftext': '',
+             'url': '', 'created_utc': created}
+            for i in range(5)
+        ]
+        posts.append({'id': f"{endpoint}{t}", 'title': '', 'selftext': f"https://{endpoint}-{t}.example.com",
+                      'url': '', 'created_utc': created})
+        # Slow enough that several workers get a share of the queue
+        time.sleep(0.3)
+        body = json.dumps({'data': {'children': [{'data': post} for post in posts], 'after': None}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CoordinatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        coordinator.DB_PATH = os.path.join(self.tmp, 'coordinator.db')
+        self.db = Database(coordinator.DB_PATH)
+        self.queue = LeaseQueue(self.db)
+        self.queue.create_tables()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp)
+
+    def test_expired_lease_cannot_complete(self):
+        self.queue.enqueue('backfill', 'test', 'new', {}, None)
+        item = self.queue.lease('w1', ttl=0.01)
+        time.sleep(0.05)
+        self.assertEqual(self.queue.lease('w2')['id'], item['id'])
+
+        self.assertFalse(self.queue.complete(item['id'], 'w1', 1))
+        self.assertTrue(self.queue.complete(item['id'], 'w2', 1))
+
+    def test_results_require_lease_holder(self):
+        self.queue.enqueue('backfill', 'test', 'new', {}, None)
+        item = self.queue.lease('w1')
+        rows = [['https://a.example.com', 'p1', time.time()]]
+
+        self.assertIsNone(self.queue.add_results(item['id'], 'w2', rows))
+        self.assertEqual(self.queue.add_results(item['id'], 'w1', rows), 1)
+
+        client = coordinator.app.test_client()
+        response = client.post('/results', json={'item': item['id'], 'worker': 'w2', 'rows': rows})
+        self.assertEqual(response.status_code, 409)
+
+    def test_requested_ttl_is_clamped(self):
+        self.queue.enqueue('backfill', 'test', 'new', {}, None)
+        client = coordinator.app.test_client()
+
+        item = client.post('/lease', json={'worker': 'w1', 'ttl': -5}).get_json()['item']
+        self.assertEqual(item['lease_ttl'], coordinator.MIN_LEASE_TTL)
+        client.post('/heartbeat', json={'item': item['id'], 'worker': 'w1', 'ttl': 10 ** 9})
+        expires = self.db.conn.execute("SELECT lease_expires FROM work_items WHERE id = ?", (item['id'],)).fetchone()[0]
+        self.assertLessEqual(expires, time.time() + coordinator.MAX_LEASE_TTL)
+
+    def test_malformed_requests_are_rejected(self):
+        client = coordinator.app.test_client()
+        self.assertEqual(client.post('/heartbeat', json={}).status_code, 400)
+        self.assertEqual(client.post('/complete', json={'item': True, 'worker': 'w1'}).status_code, 400)
+        self.assertEqual(client.post('/results', json={'item': 1, 'rows': [['only-a-url']]}).status_code, 400)
+        self.assertEqual(client.post('/results', json={'item': 1, 'rows': []}).status_code, 400)
+
+    def test_local_workers_drain_queue(self):
+        reddit = ThreadingHTTPServer(('127.0.0.1', 0), FakeRedditHandler)
+        threading.Thread(target=reddit.serve_forever, daemon=True).start()
+        server = make_server('127.0.0.1', 0, coordinator.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(reddit.shutdown)
+        self.addCleanup(server.shutdown)
+
+        endpoints = RedditURLScraperNoAuth.ENDPOINTS
+        self.assertEqual(self.queue.enqueue_backfill(['test'], 30, endpoints), len(endpoints))
+
+        # Each worker runs in its own directory to check it never creates a local database
+        workers = []
+        for n in range(3):
+            cwd = os.path.join(self.tmp, f"worker{n}")
+            os.mkdir(cwd)
+            workers.append(subprocess.Popen(
+                [sys.executable, '-c', WORKER_SCRIPT, REPO_DIR,
+                 f"http://127.0.0.1:{reddit.server_port}",
+                 f"http://127.0.0.1:{server.server_port}", f"w{n}"],
+                cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=120), 0)
+        for n in range(3):
+            self.assertEqual(os.listdir(os.path.join(self.tmp, f"worker{n}")), [])
+
+        states = self.queue.status()['states']
+        self.assertEqual(list(states), ['done'])
+        self.assertEqual(states['done']['items'], len(endpoints))
+
+        urls = [row['url'] for row in self.db.conn.execute("SELECT url FROM urls")]
+        self.assertEqual(len(urls), len(set(urls)))
+        self.assertEqual(len(urls), 5 + len(endpoints))
+
+        used = {row['worker'] for row in self.db.conn.execute("SELECT worker FROM work_items")}
+        self.assertGreater(len(used), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
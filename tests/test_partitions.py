@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class PartitionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.tmp, 'test.db'))
+        month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        self.db.add_urls([
+            ('https://hot-a.example.com', 'test', 'h1', month_start + timedelta(hours=2)),
+            ('https://hot-b.example.com', 'other', 'h2', month_start + timedelta(hours=1)),
+            ('https://warm-a.example.com', 'test', 'w1', datetime(2020, 2, 10)),
+            ('https://warm-b.example.com', 'test', 'w2', datetime(2020, 2, 20)),
+            ('https://cold-a.example.com', 'test', 'c1', datetime(2020, 1, 10)),
+            ('https://cold-b.example.com', 'other', 'c2', datetime(2020, 1, 20)),
+        ])
+        # 2020-01 ends up archived and 2020-02 as a writable partition
+        self.moved = self.db.roll_partitions(1)
+        self.compacted = self.db.compact_partitions(1)
+        self.db.unarchive_partition('2020-02')
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp)
+
+    def page(self, page, per_page=2, **kwargs):
+        return [row['post_id'] for row in self.db.get_urls(page=page, per_page=per_page, **kwargs)['urls']]
+
+    def ids(self):
+        return {row['post_id']: row['id'] for row in self.db.get_urls(per_page=100)['urls']}
+
+    def test_roll_and_compact(self):
+        self.assertEqual(self.moved, {'2020-01': 2, '2020-02': 2})
+        self.assertEqual(sorted(self.compacted), ['2020-01', '2020-02'])
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0], 2)
+        self.assertTrue(os.path.exists(self.db._partition_path('2020-01', archived=True)))
+        self.assertTrue(os.path.exists(self.db._partition_path('2020-02')))
+        self.assertEqual([month for month, _ in self.db.archived_partitions()], ['2020-01'])
+        self.assertEqual(self.db.get_stats()['total_urls'], 6)
+
+        # A late row for an archived month makes it writable again on the next roll
+        self.db.add_urls([('https://late.example.com', 'test', 'c3', datetime(2020, 1, 25))])
+        self.assertEqual(self.db.roll_partitions(1), {'2020-01': 1})
+        self.assertEqual(self.db.archived_partitions(), [])
+        self.assertEqual(self.db.get_stats(subreddit='test')['total_urls'], 5)
+
+    def test_get_urls_merges_sources(self):
+        self.assertEqual(self.page(1), ['h1', 'h2'])
+        self.assertEqual(self.page(2), ['w2', 'w1'])
+        self.assertEqual(self.page(3), ['c2', 'c1'])
+        self.assertEqual(self.page(4), [])
+        self.assertEqual(self.db.get_urls(per_page=4)['pages'], 2)
+
+        # Every page of a sort that interleaves the sources
+        pages = [self.page(n, per_page=4, sort='url', order='asc') for n in (1, 2)]
+        self.assertEqual(pages, [['c1', 'c2', 'h1', 'h2'], ['w1', 'w2']])
+        self.assertEqual(self.page(1, subreddit='other'), ['h2', 'c2'])
+        self.assertEqual(self.page(1, date_from='2020-01-15', date_to='2020-02-15'), ['w1', 'c2'])
+
+    def test_add_skips_rows_already_in_partitions(self):
+        self.assertFalse(self.db.add_url('https://cold-a.example.com', 'test', datetime(2020, 1, 10), 'c1'))
+        self.assertEqual(self.db.add_urls([
+            ('https://warm-a.example.com', 'test', 'w1', datetime(2020, 2, 10)),
+            ('https://cold-b.example.com', 'other', 'c2', datetime(2020, 1, 20)),
+            ('https://warm-c.example.com', 'test', 'w3', datetime(2020, 2, 25)),
+        ]), 1)
+        self.assertEqual(self.db.get_stats()['total_urls'], 7)
+
+    def test_writes_span_writable_files_and_skip_archives(self):
+        ids = self.ids()
+
+        self.assertEqual(self.db.update_urls([('https://warm-a.example.com/new', ids['w1'])]), 1)
+        self.assertEqual(self.db.update_urls([('https://cold-a.example.com/new', ids['c1'])]), 0)
+        self.assertEqual(self.db.update_url(ids['w2'], 'https://warm-b.example.com/new'), 1)
+        self.assertEqual(self.db.update_url(ids['c2'], 'https://cold-b.example.com/new'), 0)
+        self.assertEqual(self.db.count_archived(ids=[ids['w1'], ids['c1'], ids['c2']]), 2)
+
+        self.assertEqual(self.db.replace_in_urls('https://', 'http://', subreddit='test'), 3)
+        self.assertEqual(self.db.count_archived(contains='https://', subreddit='test'), 1)
+
+        self.assertEqual(self.db.delete_urls(subreddit='other'), 1)
+        self.assertEqual(self.db.delete_urls(ids=[ids['w1'], ids['c1']]), 1)
+        self.assertEqual(self.db.delete_url(ids['c1']), 0)
+
+        urls = {row['post_id']: row['url'] for row in self.db.get_urls(per_page=100)['urls']}
+        self.assertEqual(urls, {
+            'h1': 'http://hot-a.example.com',
+            'w2': 'http://warm-b.example.com/new',
+            'c1': 'https://cold-a.example.com',
+            'c2': 'https://cold-b.example.com',
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from repair import RepairEngine
+
+
+class RepairEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.tmp, 'test.db'))
+        now = datetime.utcnow().replace(microsecond=0)
+        self.db.add_urls([
+            # Two bad rows of one post that repair to the same URL
+            ('https://a.example.com](https://a.example.com)', 'test', 'p1', now),
+            ('https://a.example.com](https://a.example.com))', 'test', 'p1', now),
+            # A bad row whose repaired URL already exists for the post
+            ('https://b.example.com', 'test', 'p2', now),
+            ('https://b.example.com](https://b.example.com)', 'test', 'p2', now),
+            # Nothing to repair to
+            ('https://c.example.com](not-a-link)', 'test', 'p3', now),
+            ('https://d.example.com', 'test', 'p4', now),
+            # Old rows that end up in archives
+            ('https://e.example.com](https://e.example.com)', 'test', 'p5', datetime(2020, 1, 5)),
+            ('https://f.example.com', 'test', 'p6', datetime(2020, 2, 5)),
+        ])
+        self.db.roll_partitions(1)
+        self.db.compact_partitions(1)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp)
+
+    def urls(self):
+        return sorted((row['post_id'], row['url']) for row in self.db.iter_urls())
+
+    def test_run_repairs_hot_rows_and_dirty_archives(self):
+        self.assertEqual(sorted(month for month, _ in self.db.archived_partitions()), ['2020-01', '2020-02'])
+
+        counts = RepairEngine(self.db, chunk_size=1000).run()
+
+        self.assertEqual(counts['fixed'], 2)
+        self.assertEqual(counts['deleted'], 3)
+        self.assertEqual(self.urls(), [
+            ('p1', 'https://a.example.com'),
+            ('p2', 'https://b.example.com'),
+            ('p4', 'https://d.example.com'),
+            ('p5', 'https://e.example.com'),
+            ('p6', 'https://f.example.com'),
+        ])
+        # Only the month that needed a repair was made writable again
+        self.assertEqual([month for month, _ in self.db.archived_partitions()], ['2020-02'])
+        self.assertTrue(os.path.exists(self.db._partition_path('2020-01')))
+
+    def test_only_one_job_starts(self):
+        engine = RepairEngine(self.db)
+        job_id, running = engine.start_job()
+        self.assertIsNone(running)
+
+        second_id, running = engine.start_job()
+        self.assertIsNone(second_id)
+        self.assertEqual(running['id'], job_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from resolver import LinkResolver
+
+
+class RedirectHandler(BaseHTTPRequestHandler):
+    # /short/<name> -> 301 -> /final/<name>; /broken -> 404 without a redirect
+    def do_HEAD(self):
+        if self.path.startswith('/short/'):
+            self.send_response(301)
+            self.send_header('Location', f"/final/{self.path[len('/short/'):]}")
+        elif self.path.startswith('/final/'):
+            self.send_response(200)
+        else:
+            self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, *args):
+        pass
+
+
+class LinkResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RedirectHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.host = f"127.0.0.1:{self.server.server_port}"
+
+        self.tmp = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.tmp, 'test.db'))
+        self.db.add_urls([
+            (f"http://{self.host}/short/a", 'test', 'p1', datetime(2026, 1, 1)),
+            (f"http://{self.host}/short/a", 'test', 'p2', datetime(2026, 1, 2)),
+            (f"http://{self.host}/short/b", 'test', 'p3', datetime(2026, 1, 3)),
+            ('https://example.com/page', 'test', 'p4', datetime(2026, 1, 4)),
+        ])
+        self.resolver = LinkResolver(self.db, hosts=[self.host], per_host_interval=0, timeout=5)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.db.close()
+        shutil.rmtree(self.tmp)
+
+    def canonical(self):
+        cursor = self.db.conn.execute("SELECT post_id, canonical_url FROM urls")
+        return {row['post_id']: row['canonical_url'] for row in cursor.fetchall()}
+
+    def test_follows_redirects_and_caches(self):
+        counts = self.resolver.run()
+
+        self.assertEqual(counts['resolved'], 2)
+        self.assertEqual(counts['updated'], 3)
+        self.assertEqual(self.canonical(), {
+            'p1': f"http://{self.host}/final/a",
+            'p2': f"http://{self.host}/final/a",
+            'p3': f"http://{self.host}/final/b",
+            'p4': None,
+        })
+        row = self.db.conn.execute(
+            "SELECT resolved_url, status_code FROM url_resolutions WHERE url = ?",
+            (f"http://{self.host}/short/a",)
+        ).fetchone()
+        self.assertEqual(row['resolved_url'], f"http://{self.host}/final/a")
+        self.assertEqual(row['status_code'], 200)
+
+        # Fresh cache entries are not fetched again
+        self.assertEqual(self.resolver.pending_urls(), [])
+
+    def test_new_rows_get_cached_target(self):
+        self.resolver.run()
+        self.db.add_urls([(f"http://{self.host}/short/b", 'test', 'p5', datetime(2026, 1, 5))])
+
+        counts = self.resolver.run()
+
+        self.assertEqual(counts['resolved'], 0)
+        self.assertEqual(self.canonical()['p5'], f"http://{self.host}/final/b")
+
+    def test_edit_clears_canonical_url(self):
+        self.resolver.run()
+        url_id = self.db.conn.execute("SELECT id FROM urls WHERE post_id = 'p3'").fetchone()['id']
+
+        self.db.update_url(url_id, 'https://example.com/other')
+
+        self.assertIsNone(self.canonical()['p3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
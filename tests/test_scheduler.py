@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reddit_scraper_noauth import RedditURLScraperNoAuth
+from scheduler import PollScheduler, RequestBudget
+
+NOW = time.time()
+
+
+class NewListingHandler(BaseHTTPRequestHandler):
+    # /r/<sub>/new.json with 2000 posts, one a minute, newest first, 100 per page
+    requests = 0
+
+    def do_GET(self):
+        NewListingHandler.requests += 1
+        query = parse_qs(urlsplit(self.path).query)
+        start = int(query.get('after', ['0'])[0])
+        posts = [
+            {'id': f"p{i}", 'title': '', 'selftext': f"https://site{i}.example.com", 'url': '',
+             'created_utc': NOW - 60 * (i + 1)}
+            for i in range(start, min(start + 100, 2000))
+        ]
+        after = str(start + 100) if start + 100 < 2000 else None
+        body = json.dumps({'data': {'children': [{'data': post} for post in posts], 'after': after}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DailyScrapeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), NewListingHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.scraper = RedditURLScraperNoAuth(db_path=os.path.join(self.tmp, 'test.db'))
+        self.scraper.BASE_URL = f"http://127.0.0.1:{self.server.server_port}"
+        # Skip the pause between pages
+        self.scraper.budget = RequestBudget(requests_per_minute=60000, burst=100)
+        NewListingHandler.requests = 0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.scraper.db.close()
+        shutil.rmtree(self.tmp)
+
+    def test_stops_paging_at_last_scrape(self):
+        # 150 posts since the last scrape: two pages, not ten
+        self.scraper.db.conn.execute(
+            "INSERT INTO last_scrape (subreddit, last_scrape_timestamp) VALUES (?, ?)", ('test', NOW - 150 * 60 - 30)
+        )
+        self.scraper.db.conn.commit()
+
+        stats = self.scraper.scrape_subreddit_daily('test', max_pages=10)
+
+        self.assertEqual(NewListingHandler.requests, 2)
+        self.assertEqual(stats['posts_processed'], 150)
+        self.assertTrue(stats['cutoff_reached'])
+
+    def test_reports_overflowed_window(self):
+        self.scraper.db.conn.execute(
+            "INSERT INTO last_scrape (subreddit, last_scrape_timestamp) VALUES (?, ?)", ('test', NOW - 5000 * 60)
+        )
+        self.scraper.db.conn.commit()
+
+        stats = self.scraper.scrape_subreddit_daily('test', max_pages=3)
+
+        self.assertEqual(NewListingHandler.requests, 3)
+        self.assertFalse(stats['cutoff_reached'])
+
+    def test_overflow_raises_rate(self):
+        scheduler = PollScheduler(self.scraper, ['test'])
+        complete = scheduler._observe(0.01, NOW - 1000, NOW, 100, cutoff_reached=True)
+        overflowed = scheduler._observe(0.01, NOW - 1000, NOW, 100, cutoff_reached=False)
+        self.assertAlmostEqual(complete, 0.5 * 0.01 + 0.5 * 0.1)
+        self.assertGreater(overflowed, complete)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,14 @@
 import os
 import sys
 import functools
+import hashlib
+from datetime import datetime, timezone
 from flask import Flask, render_template, jsonify, request, Response, session, redirect, url_for
 import threading
 import subprocess
 from database import Database
+from repair import RepairEngine
+from response_cache import ResponseCache
 
 # Change to script directory to find database
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,6 +19,7 @@ os.chdir(SCRIPT_DIR)
 PYTHON_EXE = sys.executable
 
 app = Flask(__name__)
+DB_PATH = 'reddit_urls.db'
 app.secret_key = os.environ.get('SECRET_KEY', 'reddit-scraper-secret-key-2026')
 
 # ============================================
@@ -67,21 +72,56 @@ scrape_state = {
 def index():
     return render_template('index.html')
 
+# ============================================
+# RESPONSE CACHING (ETag + LRU keyed by data version)
+# ============================================
+response_cache = ResponseCache()
+
+def versioned_json(f):
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Read the version before computing, so a write during the query
+        # can only make the cached body newer than its key, never older
+        db = Database(DB_PATH)
+        version = db.get_data_version()
+        db.close()
+        
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        etag = f"{version}-{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]}"
+        
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = response_cache.get((key, version))
+            if body is None:
+                body = app.json.dumps(f(*args, **kwargs)).encode('utf-8')
+                response_cache.put((key, version), body)
+            response = Response(body, mimetype='application/json')
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
 @app.route('/api/stats')
 @login_required
+@versioned_json
 def get_stats():
     subreddit = request.args.get('subreddit', '')
     search = request.args.get('search', '')
-    db = Database()
+    db = Database(DB_PATH)
     stats = db.get_stats(
         subreddit=subreddit if subreddit else None,
-        search=search if search else None
+        search=search if search else None,
+        date_from=request.args.get('date_from') or None,
+        date_to=request.args.get('date_to') or None
     )
     db.close()
-    return jsonify(stats)
+    return stats
 
 @app.route('/api/urls')
 @login_required
+@versioned_json
 def get_urls():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
@@ -90,18 +130,20 @@ def get_urls():
     sort = request.args.get('sort', 'post_date')
     order = request.args.get('order', 'desc')
     
-    db = Database()
-    result = db.get_urls(page=page, per_page=per_page, search=search if search else None, subreddit=subreddit if subreddit else None, sort=sort, order=order)
+    db = Database(DB_PATH)
+    result = db.get_urls(page=page, per_page=per_page, search=search if search else None, subreddit=subreddit if subreddit else None, sort=sort, order=order,
+                         date_from=request.args.get('date_from') or None, date_to=request.args.get('date_to') or None)
     db.close()
-    return jsonify(result)
+    return result
 
 @app.route('/api/subreddits')
 @login_required
+@versioned_json
 def get_subreddits():
-    db = Database()
+    db = Database(DB_PATH)
     subreddits = db.get_subreddits()
     db.close()
-    return jsonify(subreddits)
+    return subreddits
 
 @app.route('/api/scrape/status')
 @login_required
@@ -180,7 +222,7 @@ def run_scraper():
 @app.route('/api/export')
 @login_required
 def export_csv():
-    db = Database()
+    db = Database(DB_PATH)
     import io
     import csv
     
@@ -188,9 +230,7 @@ def export_csv():
     writer = csv.writer(output)
     writer.writerow(['url', 'post_date', 'subreddit', 'post_id'])
     
-    cursor = db.conn.cursor()
-    cursor.execute("SELECT url, post_date, subreddit, post_id FROM urls ORDER BY post_date DESC")
-    for row in cursor.fetchall():
+    for row in db.iter_urls():
         writer.writerow([row['url'], row['post_date'], row['subreddit'], row['post_id']])
     
     db.close()
@@ -205,18 +245,18 @@ def export_csv():
 @app.route('/api/urls/<int:url_id>', methods=['PUT'])
 @login_required
 def update_url(url_id):
-    data = request.json
+    data = request.get_json(silent=True) or {}
     new_url = data.get('url')
-    if not new_url:
+    if not isinstance(new_url, str) or not new_url:
         return jsonify({'error': 'URL required'}), 400
     
-    db = Database()
-    cursor = db.conn.cursor()
-    cursor.execute("UPDATE urls SET url = ? WHERE id = ?", (new_url, url_id))
-    db.conn.commit()
-    affected = cursor.rowcount
+    db = Database(DB_PATH)
+    affected = db.update_url(url_id, new_url)
+    archived = not affected and db.count_archived(ids=[url_id])
     db.close()
     
+    if archived:
+        return jsonify({'error': 'URL is in an archived month (read-only)'}), 409
     if affected == 0:
         return jsonify({'error': 'URL not found'}), 404
     return jsonify({'success': True})
@@ -224,65 +264,152 @@ def update_url(url_id):
 @app.route('/api/urls/<int:url_id>', methods=['DELETE'])
 @login_required
 def delete_url(url_id):
-    db = Database()
-    cursor = db.conn.cursor()
-    cursor.execute("DELETE FROM urls WHERE id = ?", (url_id,))
-    db.conn.commit()
-    affected = cursor.rowcount
+    db = Database(DB_PATH)
+    affected = db.delete_url(url_id)
+    archived = not affected and db.count_archived(ids=[url_id])
     db.close()
     
+    if archived:
+        return jsonify({'error': 'URL is in an archived month (read-only)'}), 409
     if affected == 0:
         return jsonify({'error': 'URL not found'}), 404
     return jsonify({'success': True})
 
+def is_id(value):
+    # bool is a subclass of int; true must not mean id 1
+    return isinstance(value, int) and not isinstance(value, bool)
+
+FILTER_KEYS = ('subreddit', 'search', 'date_from', 'date_to')
+
+def parse_filter(filters):
+    # Returns (filter kwargs, None) or (None, error). Values go into SQL comparisons, so
+    # dates must be real dates: 'Feb 2025' or a number would compare true for every row.
+    if not isinstance(filters, dict):
+        return None, 'filter must be an object'
+    selection = {}
+    for key in FILTER_KEYS:
+        value = filters.get(key)
+        if value is None or value == '':
+            selection[key] = None
+            continue
+        if not isinstance(value, str):
+            return None, f'{key} must be a string'
+        if key.startswith('date_'):
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                return None, f'{key} must be an ISO date (YYYY-MM-DD)'
+            if parsed.tzinfo:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            value = parsed.strftime('%Y-%m-%d %H:%M:%S')
+        selection[key] = value
+    if not any(selection.values()):
+        return None, 'Filter must not be empty'
+    return selection, None
+
+@app.route('/api/urls/batch-delete', methods=['POST'])
+@login_required
+def batch_delete_urls():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON body required'}), 400
+    ids = data.get('ids')
+    filters = data.get('filter')
+    
+    if ids is not None:
+        if not isinstance(ids, list) or not all(is_id(i) for i in ids):
+            return jsonify({'error': 'ids must be a list of integers'}), 400
+        selection = {'ids': ids}
+    else:
+        if filters is None:
+            return jsonify({'error': 'ids or filter required'}), 400
+        selection, error = parse_filter(filters)
+        if error:
+            return jsonify({'error': error}), 400
+    
+    db = Database(DB_PATH, timeout=30)
+    # Archived months are read-only; the caller must agree to keep those rows
+    archived = db.count_archived(**selection)
+    if archived and not data.get('skip_archived'):
+        db.close()
+        return jsonify({'error': f'{archived} of these URLs are in archived months (read-only)', 'archived': archived}), 409
+    deleted = db.delete_urls(**selection)
+    db.close()
+    return jsonify({'deleted': deleted, 'archived': archived})
+
+@app.route('/api/urls/batch-update', methods=['POST'])
+@login_required
+def batch_update_urls():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON body required'}), 400
+    updates = data.get('updates')
+    
+    if updates is None and data.get('filter') is not None:
+        # Find/replace over every URL matching the filter
+        filters, error = parse_filter(data['filter'])
+        if error:
+            return jsonify({'error': error}), 400
+        find, replace = data.get('find'), data.get('replace')
+        if not isinstance(find, str) or not find or not isinstance(replace, str):
+            return jsonify({'error': 'find and replace required'}), 400
+        db = Database(DB_PATH, timeout=30)
+        updated = db.replace_in_urls(find, replace, **filters)
+        archived = db.count_archived(contains=find, **filters)
+        db.close()
+        return jsonify({'updated': updated, 'archived': archived})
+    
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'error': 'updates or filter required'}), 400
+    
+    rows = []
+    for item in updates:
+        if not isinstance(item, dict) or not is_id(item.get('id')) or not isinstance(item.get('url'), str) or not item['url']:
+            return jsonify({'error': 'Each update needs an integer id and a url'}), 400
+        rows.append((item['url'], item['id']))
+    
+    db = Database(DB_PATH, timeout=30)
+    updated = db.update_urls(rows)
+    archived = db.count_archived(ids=[url_id for _, url_id in rows])
+    db.close()
+    return jsonify({'updated': updated, 'skipped': len(rows) - updated, 'archived': archived})
+
 @app.route('/api/urls/fix-malformed', methods=['POST'])
 @login_required
 def fix_malformed_urls():
-    import sqlite3
-    conn = sqlite3.connect('reddit_urls.db', timeout=30)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    # Job state lives in the database so any gunicorn worker can report progress
+    db = Database(DB_PATH, timeout=30)
+    engine = RepairEngine(db)
+    job_id, running = engine.start_job()
+    db.close()
+    if running:
+        return jsonify({'error': 'Already running', 'job': running}), 400
     
-    try:
-        cursor.execute("SELECT id, url, subreddit, post_id FROM urls WHERE url LIKE '%](%'")
-        rows = cursor.fetchall()
-        
-        fixed = 0
-        deleted = 0
-        
-        for row in rows:
-            url = row['url']
-            if '](http' in url:
-                parts = url.split('](')
-                if len(parts) >= 2:
-                    clean_url = parts[1].rstrip(')')
-                    clean_url = clean_url.split(')')[0].split('<')[0].split('!')[0]
-                    if clean_url.startswith('http'):
-                        cursor.execute(
-                            "SELECT id FROM urls WHERE url = ? AND subreddit = ? AND post_id = ?",
-                            (clean_url, row['subreddit'], row['post_id'])
-                        )
-                        existing = cursor.fetchone()
-                        if existing:
-                            cursor.execute("DELETE FROM urls WHERE id = ?", (row['id'],))
-                            deleted += 1
-                        else:
-                            cursor.execute("UPDATE urls SET url = ? WHERE id = ?", (clean_url, row['id']))
-                            fixed += 1
-                    else:
-                        cursor.execute("DELETE FROM urls WHERE id = ?", (row['id'],))
-                        deleted += 1
-            else:
-                cursor.execute("DELETE FROM urls WHERE id = ?", (row['id'],))
-                deleted += 1
-        
-        conn.commit()
-        return jsonify({'fixed': fixed, 'deleted': deleted})
-    except Exception as e:
-        conn.rollback()
-        return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
+    def run_in_thread():
+        db = Database(DB_PATH, timeout=30)
+        try:
+            RepairEngine(db).run(job_id=job_id)
+        except Exception:
+            pass  # recorded on the job row
+        finally:
+            db.close()
+    
+    thread = threading.Thread(target=run_in_thread)
+    thread.daemon = True
+    thread.start()
+    
+    return jsonify({'status': 'started', 'job_id': job_id})
+
+@app.route('/api/urls/fix-malformed/status')
+@login_required
+def fix_malformed_status():
+    job_id = request.args.get('job_id', type=int)
+    db = Database(DB_PATH)
+    job = RepairEngine(db).get_job(job_id)
+    db.close()
+    if not job:
+        return jsonify({'error': 'No repair job found'}), 404
+    return jsonify(job)
 
 if __name__ == '__main__':
     # Load .env file if exists (for local development)